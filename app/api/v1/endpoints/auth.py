@@ -5,31 +5,69 @@
 from datetime import datetime, timedelta
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.database import get_db
+from app.database.database import get_async_db, get_read_db, use_primary_if_written
 from app.models.user import User
-from app.schemas.user import UserLogin, Token, TokenRefresh, TokenResponse, UserResponse
+from app.schemas.user import UserCreate, UserLogin, Token, TokenRefresh, TokenResponse, UserResponse
 from app.core.config import settings
-from app.core.logging import logger
-from app.core.exceptions import AuthenticationException
-from app.core.security import create_access_token, create_refresh_token, verify_token, get_password_hash
+from app.core.logging import get_logger
+from app.core.timing import TimedRoute
+from app.core.etag import user_response
+from app.core.cache import invalidate_user_cache
+from app.core.exceptions import AuthenticationException, RateLimitException
+from app.core.last_login import last_login_buffer
+from app.core.ratelimit import login_ip_limiter, login_username_limiter
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    hash_password_async,
+    revoke_token,
+    verify_token,
+)
 from app.core.deps import (
     get_current_user,
     get_current_active_user,
     authenticate_user,
+    duplicate_user_message,
     get_user_by_username,
-    get_user_by_email,
+    insert_user,
+    mark_user_written,
+    optional_oauth2_scheme,
 )
 
+logger = get_logger(__name__)
+
 # 创建路由器
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
-@router.post("/login", response_model=TokenResponse)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)) -> TokenResponse:
+async def login_rate_limit(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> None:
+    """
+    登录限流依赖
+
+    在打开数据库会话和验证密码之前执行：按客户端IP统计全部登录请求，
+    并检查该用户名近期的登录失败次数。
+
+    Raises:
+        RateLimitException: 超出频率限制
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = await login_ip_limiter.hit(client_ip)
+    if not retry_after:
+        retry_after = await login_username_limiter.hit(form_data.username, cost=0)
+    if retry_after:
+        logger.warning("登录请求被限流", client_ip=client_ip, username=form_data.username)
+        raise RateLimitException(retry_after)
+
+
+@router.post("/login", response_model=TokenResponse, dependencies=[Depends(login_rate_limit)])
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
+) -> TokenResponse:
     """
     用户登录
 
@@ -42,16 +80,17 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 
     Raises:
         AuthenticationException: 登录失败
+        RateLimitException: 登录请求过于频繁（由login_rate_limit依赖抛出）
     """
     try:
         # 认证用户
-        user = authenticate_user(form_data.username, form_data.password, db)
+        user = await authenticate_user(form_data.username, form_data.password, db)
         if not user:
+            await login_username_limiter.hit(form_data.username)
             raise AuthenticationException("用户名或密码错误")
 
-        # 更新最后登录时间
-        user.last_login = datetime.utcnow()
-        db.commit()
+        # 记录最后登录时间（由缓冲批量写入）
+        await last_login_buffer.record(user.id, user.username, datetime.utcnow())
 
         # 创建访问令牌和刷新令牌
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -73,7 +112,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 
 
 @router.post("/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)) -> UserResponse:
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)) -> UserResponse:
     """
     用户注册
 
@@ -88,66 +127,68 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)) -> User
         AuthenticationException: 注册失败
     """
     try:
-        # 检查用户名是否已存在
-        existing_user = get_user_by_username(user_data.username, db)
-        if existing_user:
-            raise AuthenticationException("用户名已存在")
-
-        # 检查邮箱是否已存在
-        existing_email = get_user_by_email(user_data.email, db)
-        if existing_email:
-            raise AuthenticationException("邮箱已存在")
-
         # 加密密码
-        hashed_password = get_password_hash(user_data.password)
-
-        # 创建新用户
-        db_user = User(
-            username=user_data.username,
-            email=user_data.email,
-            full_name=user_data.full_name,
-            avatar=user_data.avatar,
-            bio=user_data.bio,
-            hashed_password=hashed_password,
-            is_active=True,
-        )
-
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        hashed_password = await hash_password_async(user_data.password)
+
+        # 创建新用户，用户名和邮箱的唯一性由数据库约束保证
+        try:
+            db_user = await insert_user(
+                db,
+                {
+                    "username": user_data.username,
+                    "email": user_data.email,
+                    "full_name": user_data.full_name,
+                    "avatar": user_data.avatar,
+                    "bio": user_data.bio,
+                    "hashed_password": hashed_password,
+                    "is_active": True,
+                },
+            )
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            message = duplicate_user_message(e)
+            if message is None:
+                raise
+            raise AuthenticationException(message)
+        await invalidate_user_cache(db_user.id)
+        await mark_user_written(db_user.id, db_user.username)
 
         logger.info(f"用户注册成功，用户名: {user_data.username}")
         return db_user
     except AuthenticationException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"用户注册失败，用户名: {user_data.username}, 错误: {str(e)}")
         raise AuthenticationException("注册失败")
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_active_user)) -> UserResponse:
+async def get_current_user_info(
+    if_none_match: Optional[str] = Header(None), current_user: User = Depends(get_current_active_user)
+) -> Response:
     """
     获取当前用户信息
 
     Args:
+        if_none_match: If-None-Match请求头
         current_user: 当前活跃用户
 
     Returns:
-        当前用户信息
+        当前用户信息，ETag未变化时返回304
     """
-    return current_user
+    return user_response(current_user, if_none_match)
 
 
 @router.post("/refresh", response_model=TokenResponse)
-async def refresh_token(refresh_data: TokenRefresh, db: Session = Depends(get_db)) -> TokenResponse:
+async def refresh_token(refresh_data: TokenRefresh, db: AsyncSession = Depends(get_read_db)) -> TokenResponse:
     """
     刷新访问令牌
 
     Args:
         refresh_data: 刷新令牌数据
-        db: 数据库会话
+        db: 只读数据库会话
 
     Returns:
         新的访问令牌和刷新令牌
@@ -163,8 +204,14 @@ async def refresh_token(refresh_data: TokenRefresh, db: Session = Depends(get_db
         if username is None:
             raise AuthenticationException("无效的刷新令牌")
 
-        # 查找用户
-        user = get_user_by_username(username, db)
+        # 撤销旧的刷新令牌，每个刷新令牌只能使用一次：撤销是原子操作，
+        # 同一令牌的并发请求中只有一个能撤销成功，其余请求被拒绝
+        if not await revoke_token(refresh_data.refresh_token):
+            raise AuthenticationException("刷新令牌已被使用")
+
+        # 查找用户（刚被修改或停用的用户从主库读取）
+        await use_primary_if_written(db, f"username:{username}")
+        user = await get_user_by_username(username, db)
         if user is None or not user.is_active:
             raise AuthenticationException("用户不存在或未激活")
 
@@ -188,13 +235,26 @@ async def refresh_token(refresh_data: TokenRefresh, db: Session = Depends(get_db
 
 
 @router.post("/logout")
-async def logout() -> dict:
+async def logout(
+    refresh_data: Optional[TokenRefresh] = None, token: Optional[str] = Depends(optional_oauth2_scheme)
+) -> dict:
     """
     用户登出
 
+    撤销请求携带的访问令牌，以及请求体中可选的刷新令牌。
+    无效或已过期的令牌会被忽略。
+
+    Args:
+        refresh_data: 刷新令牌数据（可选）
+        token: 访问令牌（可选）
+
     Returns:
         登出结果
     """
-    # 注意：实际应用中可能需要将令牌加入黑名单
-    logger.info("用户登出成功")
+    revoked = 0
+    for candidate in (token, refresh_data.refresh_token if refresh_data else None):
+        if candidate and await revoke_token(candidate):
+            revoked += 1
+
+    logger.info("用户登出成功", revoked_tokens=revoked)
     return {"message": "登出成功"}
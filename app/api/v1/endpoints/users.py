@@ -2,58 +2,251 @@
 用户管理API端点
 """
 
-from typing import List, Optional
-
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-
-from app.database.database import get_db
+import base64
+import binascii
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.database import (
+    ReadSessionLocal,
+    async_engine,
+    get_async_db,
+    get_read_db,
+    replica_set,
+    use_primary_if_written,
+)
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate, UserResponse
-from app.core.logging import logger
+from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserPage, BulkImportRow, BulkImportResult
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.timing import TimedRoute
+from app.core.responses import ORJSON_OPTIONS, USER_RESPONSE_FIELDS, json_response
+from app.core.etag import etag_matches, list_etag, not_modified, user_etag, user_response
+from app.core.cache import invalidate_user_cache, user_cache, user_cache_key
 from app.core.exceptions import NotFoundException, ValidationException
-from app.core.deps import get_current_active_user, get_current_superuser
-from app.core.security import get_password_hash
+from app.core.deps import (
+    get_current_active_user,
+    get_current_superuser,
+    duplicate_user_message,
+    insert_user,
+    invalidate_principal,
+    mark_user_written,
+    update_user_row,
+)
+from app.core.security import hash_password_async, hash_passwords_async
+
+logger = get_logger(__name__)
 
 # 创建路由器
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+
+def _encode_cursor(user_id: int) -> str:
+    """将最后一条记录的ID编码为不透明游标"""
+    return base64.urlsafe_b64encode(str(user_id).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    """
+    解码游标
+
+    Raises:
+        ValidationException: 游标格式无效
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationException("无效的分页游标")
+
+
+def _page_query(columns, cursor: Optional[str], skip: int, limit: int):
+    """构造按ID排序的分页查询，游标模式多查询一条用于判断是否还有下一页"""
+    query = select(*columns).order_by(User.id)
+    if cursor is None:
+        return query.offset(skip).limit(limit)
 
+    query = query.limit(limit + 1)
+    if cursor:
+        query = query.where(User.id > _decode_cursor(cursor))
+    return query
 
-@router.get("/", response_model=List[UserResponse])
+
+@router.get("/", response_model=Union[UserPage, List[UserResponse]])
 async def get_users(
-    skip: int = Query(0, ge=0, description="跳过的记录数"),
-    limit: int = Query(20, ge=1, le=100, description="返回的记录数"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="分页游标，传空字符串获取第一页；不传则使用skip/limit兼容模式"),
+    skip: int = Query(0, ge=0, description="跳过的记录数（兼容模式）"),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE, description="返回的记录数"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
-) -> List[UserResponse]:
+) -> Response:
     """
     获取用户列表
 
+    传入cursor时使用按ID的游标分页，每页开销与翻页深度无关，返回
+    包含next_cursor的分页结构；否则使用skip/limit兼容模式返回用户列表。
+    只查询响应字段并直接以JSON返回，跳过response_model的二次校验。
+
+    响应带有由页内用户ID和更新时间生成的弱ETag；请求携带If-None-Match时
+    先只查询ID和更新时间，未变化则直接返回304。
+
     Args:
+        cursor: 分页游标
         skip: 跳过的记录数
         limit: 返回的记录数
-        db: 数据库会话
+        if_none_match: If-None-Match请求头
+        db: 只读数据库会话
 
     Returns:
-        用户列表
+        用户分页结构或用户列表
     """
+    variant = "list" if cursor is None else "page"
+
     try:
-        users = db.query(User).offset(skip).limit(limit).all()
-        logger.info(f"获取用户列表成功，共{len(users)}条记录")
-        return users
+        if if_none_match:
+            result = await db.execute(_page_query((User.id, User.updated_at), cursor, skip, limit))
+            etag = list_etag(result.all(), variant)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        result = await db.execute(
+            _page_query([getattr(User, field) for field in USER_RESPONSE_FIELDS], cursor, skip, limit)
+        )
+        users = [row._asdict() for row in result]
     except Exception as e:
         logger.error(f"获取用户列表失败: {str(e)}")
         raise HTTPException(status_code=500, detail="获取用户列表失败")
 
+    logger.info("获取用户列表成功", count=min(len(users), limit))
+    headers = {"ETag": list_etag(((user["id"], user["updated_at"]) for user in users), variant)}
+    if cursor is None:
+        return json_response(users, headers=headers)
+
+    next_cursor = _encode_cursor(users[limit - 1]["id"]) if len(users) > limit else None
+    return json_response({"items": users[:limit], "next_cursor": next_cursor}, headers=headers)
+
+
+# 导出字段与UserResponse保持一致
+EXPORT_FIELDS = list(UserResponse.model_fields)
+
+
+def _csv_value(value):
+    """将导出字段值转换为CSV单元格的值，时间格式与JSON响应一致"""
+    if isinstance(value, datetime):
+        return orjson.dumps(value, option=ORJSON_OPTIONS)[1:-1].decode()
+    return value
+
+
+async def _stream_export(query, export_format: str) -> AsyncIterator[bytes]:
+    """
+    通过服务端游标分批读取用户并输出
+
+    使用独立会话（配置了只读副本时使用副本），保证在响应流结束前会话保持打开；
+    每批数据输出一个块，内存占用与表大小无关。
+    """
+    async with ReadSessionLocal(bind=replica_set.choose() or async_engine) as db:
+        result = await db.stream(query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_FIELDS)
+            yield buffer.getvalue().encode("utf-8")
+
+        async for rows in result.partitions():
+            if export_format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows([_csv_value(value) for value in row] for row in rows)
+                yield buffer.getvalue().encode("utf-8")
+            else:
+                # 与JSON响应使用相同的orjson选项，时间格式与 GET /users 一致
+                yield b"".join(
+                    orjson.dumps(dict(zip(EXPORT_FIELDS, row)), option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+                    for row in rows
+                )
+
+
+@router.get("/export")
+async def export_users(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="导出格式"),
+    is_active: Optional[bool] = Query(None, description="按激活状态过滤"),
+    created_after: Optional[datetime] = Query(None, description="创建时间下限（含）"),
+    created_before: Optional[datetime] = Query(None, description="创建时间上限（不含）"),
+    current_user: User = Depends(get_current_active_user),
+) -> StreamingResponse:
+    """
+    流式导出全部用户
+
+    Args:
+        export_format: 导出格式（ndjson或csv）
+        is_active: 按激活状态过滤
+        created_after: 创建时间下限
+        created_before: 创建时间上限
+
+    Returns:
+        NDJSON或CSV流式响应
+    """
+    query = select(*(getattr(User, field) for field in EXPORT_FIELDS)).order_by(User.id)
+    if is_active is not None:
+        query = query.where(User.is_active == is_active)
+    if created_after is not None:
+        query = query.where(User.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(User.created_at < created_before)
+
+    logger.info(f"导出用户，格式: {export_format}")
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_export(query, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="users.{export_format}"'},
+    )
+
+
+async def _cached_user_response(user_id: int, if_none_match: Optional[str]) -> Optional[Response]:
+    """从缓存构造用户响应，未命中返回None"""
+    cached = await user_cache.get(user_cache_key(user_id))
+    if cached is None:
+        return None
+
+    etag, _, body = cached.partition(b"\n")
+    etag = etag.decode()
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, db: Session = Depends(get_db)) -> UserResponse:
+async def get_user(
+    user_id: int, if_none_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_read_db)
+) -> Response:
     """
     根据ID获取用户信息
 
+    先读取响应缓存（缓存内容为ETag和序列化后的响应体），未命中时查询数据库
+    并写入缓存。请求携带If-None-Match时先只查询更新时间，ETag未变化则
+    直接返回304，不加载和序列化完整记录。
+
+    查询完整记录之前先获取回填租约，查询期间用户被更新（缓存失效）时放弃回填，
+    避免旧数据在失效之后写回缓存。
+
     Args:
         user_id: 用户ID
-        db: 数据库会话
+        if_none_match: If-None-Match请求头
+        db: 只读数据库会话
 
     Returns:
         用户信息
@@ -61,23 +254,45 @@ async def get_user(user_id: int, db: Session = Depends(get_db)) -> UserResponse:
     Raises:
         NotFoundException: 用户不存在
     """
+    cached_response = await _cached_user_response(user_id, if_none_match)
+    if cached_response is not None:
+        return cached_response
+
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        await use_primary_if_written(db, f"user:{user_id}")
+        if if_none_match:
+            row = (await db.execute(select(User.updated_at).where(User.id == user_id))).first()
+            if row is None:
+                raise NotFoundException(f"用户ID {user_id} 不存在")
+            etag = user_etag(user_id, row.updated_at)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        lease = await user_cache.lease(user_cache_key(user_id))
+        user = await db.get(User, user_id)
         if not user:
             raise NotFoundException(f"用户ID {user_id} 不存在")
-
-        logger.info(f"获取用户信息成功，用户ID: {user_id}")
-        return user
     except NotFoundException:
         raise
     except Exception as e:
         logger.error(f"获取用户信息失败，用户ID: {user_id}, 错误: {str(e)}")
         raise HTTPException(status_code=500, detail="获取用户信息失败")
 
+    response = user_response(user)
+    if lease is not None:
+        await user_cache.set_if_leased(
+            user_cache_key(user_id),
+            lease,
+            response.headers["etag"].encode() + b"\n" + response.body,
+            settings.USER_CACHE_TTL,
+        )
+    logger.info("获取用户信息成功", user_id=user_id)
+    return response
+
 
 @router.post("/", response_model=UserResponse)
 async def create_user(
-    user: UserCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_superuser)
+    user: UserCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_superuser)
 ) -> UserResponse:
     """
     创建新用户
@@ -93,48 +308,282 @@ async def create_user(
         ValidationException: 数据验证失败
     """
     try:
-        # 检查用户名是否已存在
-        existing_user = db.query(User).filter(User.username == user.username).first()
-        if existing_user:
-            raise ValidationException("用户名已存在")
-
-        # 检查邮箱是否已存在
-        existing_email = db.query(User).filter(User.email == user.email).first()
-        if existing_email:
-            raise ValidationException("邮箱已存在")
-
         # 加密密码
-        hashed_password = get_password_hash(user.password)
-
-        # 创建新用户
-        db_user = User(
-            username=user.username,
-            email=user.email,
-            full_name=user.full_name,
-            avatar=user.avatar,
-            bio=user.bio,
-            hashed_password=hashed_password,
-        )
-
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        hashed_password = await hash_password_async(user.password)
+
+        # 创建新用户，用户名和邮箱的唯一性由数据库约束保证
+        try:
+            db_user = await insert_user(
+                db,
+                {
+                    "username": user.username,
+                    "email": user.email,
+                    "full_name": user.full_name,
+                    "avatar": user.avatar,
+                    "bio": user.bio,
+                    "hashed_password": hashed_password,
+                },
+            )
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            message = duplicate_user_message(e)
+            if message is None:
+                raise
+            raise ValidationException(message)
+        await invalidate_user_cache(db_user.id)
+        await mark_user_written(db_user.id, db_user.username)
 
         logger.info(f"创建用户成功，用户ID: {db_user.id}")
         return db_user
     except ValidationException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"创建用户失败: {str(e)}")
         raise HTTPException(status_code=500, detail="创建用户失败")
 
 
+async def _iter_lines(request: Request) -> AsyncIterator[bytes]:
+    """逐行读取流式请求体"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if buffer:
+        yield buffer.rstrip(b"\r")
+
+
+async def _iter_rows(request: Request) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    解析NDJSON或CSV请求体
+
+    CSV首行为表头，且不支持跨行的引号字段。
+
+    Yields:
+        (行号, 行数据, 解析错误)
+    """
+    is_csv = "csv" in request.headers.get("content-type", "")
+    header: Optional[List[str]] = None
+    line_no = 0
+
+    async for raw_line in _iter_lines(request):
+        line_no += 1
+        try:
+            line = raw_line.decode("utf-8")
+        except UnicodeDecodeError:
+            yield line_no, None, "编码无效，应为UTF-8"
+            continue
+        if not line.strip():
+            continue
+
+        if not is_csv:
+            try:
+                data = json.loads(line)
+            except ValueError:
+                yield line_no, None, "JSON格式无效"
+                continue
+            if not isinstance(data, dict):
+                yield line_no, None, "每行必须是JSON对象"
+                continue
+            yield line_no, data, None
+            continue
+
+        try:
+            values = next(csv.reader([line]))
+        except csv.Error:
+            yield line_no, None, "CSV格式无效"
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield line_no, None, "CSV列数与表头不一致"
+            continue
+        yield line_no, {key: value or None for key, value in zip(header, values)}, None
+
+
+async def _import_batch(
+    db: AsyncSession,
+    batch: List[Tuple[int, UserCreate]],
+    seen_usernames: Set[str],
+    seen_emails: Set[str],
+) -> List[BulkImportRow]:
+    """
+    校验一批用户的唯一性，并行哈希密码后批量插入
+
+    Args:
+        db: 数据库会话
+        batch: (行号, 用户数据) 列表
+        seen_usernames: 本次导入中已出现的用户名
+        seen_emails: 本次导入中已出现的邮箱
+
+    Returns:
+        本批次每行的导入结果
+    """
+    usernames = [user.username for _, user in batch]
+    emails = [user.email for _, user in batch]
+    result = await db.execute(
+        select(User.username, User.email).where(or_(User.username.in_(usernames), User.email.in_(emails)))
+    )
+    existing_usernames: Set[str] = set()
+    existing_emails: Set[str] = set()
+    for username, email in result.all():
+        existing_usernames.add(username)
+        existing_emails.add(email)
+
+    results: Dict[int, BulkImportRow] = {}
+    accepted: List[Tuple[int, UserCreate]] = []
+    for line_no, user in batch:
+        if user.username in existing_usernames or user.username in seen_usernames:
+            results[line_no] = BulkImportRow(line=line_no, username=user.username, status="error", error="用户名已存在")
+        elif user.email in existing_emails or user.email in seen_emails:
+            results[line_no] = BulkImportRow(line=line_no, username=user.username, status="error", error="邮箱已存在")
+        else:
+            accepted.append((line_no, user))
+        seen_usernames.add(user.username)
+        seen_emails.add(user.email)
+
+    hashed_passwords = await hash_passwords_async([user.password for _, user in accepted])
+    values = [
+        {
+            "username": user.username,
+            "email": user.email,
+            "full_name": user.full_name,
+            "avatar": user.avatar,
+            "bio": user.bio,
+            "hashed_password": hashed_password,
+        }
+        for (_, user), hashed_password in zip(accepted, hashed_passwords)
+    ]
+
+    if values:
+        try:
+            await db.execute(insert(User), values)
+            await db.commit()
+            inserted = [True] * len(values)
+        except IntegrityError:
+            # 与并发写入冲突时逐行插入，以便准确报告每行结果
+            await db.rollback()
+            inserted = []
+            for row in values:
+                try:
+                    await db.execute(insert(User), [row])
+                    await db.commit()
+                    inserted.append(True)
+                except IntegrityError:
+                    await db.rollback()
+                    inserted.append(False)
+
+        for (line_no, user), ok in zip(accepted, inserted):
+            results[line_no] = BulkImportRow(
+                line=line_no,
+                username=user.username,
+                status="created" if ok else "error",
+                error=None if ok else "用户名或邮箱已存在",
+            )
+
+    return [results[line_no] for line_no, _ in batch]
+
+
+def _busy_rows(batch: List[Tuple[int, UserCreate]]) -> List[BulkImportRow]:
+    """密码哈希服务繁忙时未导入的行"""
+    return [
+        BulkImportRow(line=line_no, username=user.username, status="error", error="服务繁忙") for line_no, user in batch
+    ]
+
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_users(
+    request: Request, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_superuser)
+) -> BulkImportResult:
+    """
+    批量导入用户
+
+    请求体为NDJSON（每行一个用户对象）或CSV（Content-Type: text/csv，首行为表头），
+    流式读取并按批次校验、哈希和插入，每批单独提交。密码哈希服务繁忙（503）时
+    不再导入之后的行，这些行标记为失败，仍返回已提交批次在内的逐行报告。
+
+    Args:
+        request: 请求对象
+        db: 数据库会话
+
+    Returns:
+        每行的导入结果报告
+    """
+    results: List[BulkImportRow] = []
+    batch: List[Tuple[int, UserCreate]] = []
+    seen_usernames: Set[str] = set()
+    seen_emails: Set[str] = set()
+    busy = False
+
+    async def import_batch() -> None:
+        """导入当前批次，服务繁忙后的批次直接标记为失败"""
+        nonlocal busy
+        if not busy:
+            try:
+                results.extend(await _import_batch(db, batch, seen_usernames, seen_emails))
+                return
+            except HTTPException as e:
+                if e.status_code != 503:
+                    raise
+                await db.rollback()
+                busy = True
+                logger.warning("批量导入时密码哈希服务繁忙，其余行不再导入", line=batch[0][0])
+        results.extend(_busy_rows(batch))
+
+    try:
+        async for line_no, data, error in _iter_rows(request):
+            if error is None:
+                try:
+                    batch.append((line_no, UserCreate(**data)))
+                except ValidationError as e:
+                    error = "; ".join(err["msg"] for err in e.errors())
+            if error is not None:
+                # 未通过校验的行中用户名可能不是字符串
+                username = data.get("username") if data else None
+                if username is not None:
+                    username = str(username)
+                results.append(BulkImportRow(line=line_no, username=username, status="error", error=error))
+
+            if len(batch) >= settings.BULK_IMPORT_BATCH_SIZE:
+                await import_batch()
+                batch = []
+
+        if batch:
+            await import_batch()
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"批量导入用户失败: {str(e)}")
+        raise HTTPException(status_code=500, detail="批量导入用户失败")
+
+    results.sort(key=lambda row: row.line)
+    created = sum(1 for row in results if row.status == "created")
+    logger.info(f"批量导入用户完成，成功{created}条，失败{len(results) - created}条")
+    return BulkImportResult(total=len(results), created=created, failed=len(results) - created, results=results)
+
+
+async def _update_values(user_update: UserUpdate) -> dict:
+    """
+    获取需要更新的列值
+
+    只包含请求中提交的字段，新密码加密后写入hashed_password。
+    """
+    values = user_update.model_dump(exclude_unset=True)
+    if "password" in values:
+        values["hashed_password"] = await hash_password_async(values.pop("password"))
+    return values
+
+
 @router.put("/{user_id}", response_model=UserResponse)
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user),
 ) -> UserResponse:
     """
@@ -153,49 +602,44 @@ async def update_user(
         ValidationException: 数据验证失败
     """
     try:
-        # 查找用户
-        db_user = db.query(User).filter(User.id == user_id).first()
+        update_data = await _update_values(user_update)
+
+        # 修改用户名时需要旧用户名使快照缓存失效
+        old_username = None
+        if "username" in update_data:
+            old_username = await db.scalar(select(User.username).where(User.id == user_id))
+
+        # 只更新提交的列，用户名和邮箱的唯一性由数据库约束保证
+        try:
+            db_user = await update_user_row(db, user_id, update_data)
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            message = duplicate_user_message(e)
+            if message is None:
+                raise
+            raise ValidationException(message)
         if not db_user:
             raise NotFoundException(f"用户ID {user_id} 不存在")
 
-        # 检查用户名唯一性
-        if user_update.username:
-            existing_user = db.query(User).filter(User.username == user_update.username, User.id != user_id).first()
-            if existing_user:
-                raise ValidationException("用户名已存在")
-
-        # 检查邮箱唯一性
-        if user_update.email:
-            existing_email = db.query(User).filter(User.email == user_update.email, User.id != user_id).first()
-            if existing_email:
-                raise ValidationException("邮箱已存在")
-
-        # 更新用户信息
-        update_data = user_update.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            if field == "password":
-                # 加密新密码
-                hashed_password = get_password_hash(value)
-                setattr(db_user, "hashed_password", hashed_password)
-            else:
-                setattr(db_user, field, value)
-
-        db.commit()
-        db.refresh(db_user)
+        # 使用户快照缓存失效，确保停用或权限变更立即生效
+        invalidate_principal(old_username, db_user.username)
+        await invalidate_user_cache(user_id)
+        await mark_user_written(user_id, old_username, db_user.username)
 
         logger.info(f"更新用户信息成功，用户ID: {user_id}")
         return db_user
     except (NotFoundException, ValidationException):
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"更新用户信息失败，用户ID: {user_id}, 错误: {str(e)}")
         raise HTTPException(status_code=500, detail="更新用户信息失败")
 
 
 @router.delete("/{user_id}")
 async def delete_user(
-    user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_superuser)
+    user_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_superuser)
 ) -> dict:
     """
     删除用户
@@ -212,41 +656,49 @@ async def delete_user(
     """
     try:
         # 查找用户
-        db_user = db.query(User).filter(User.id == user_id).first()
+        db_user = await db.get(User, user_id)
         if not db_user:
             raise NotFoundException(f"用户ID {user_id} 不存在")
 
         # 删除用户
-        db.delete(db_user)
-        db.commit()
+        await db.delete(db_user)
+        await db.commit()
+        invalidate_principal(db_user.username)
+        await invalidate_user_cache(user_id)
+        await mark_user_written(user_id, db_user.username)
 
         logger.info(f"删除用户成功，用户ID: {user_id}")
         return {"message": f"用户ID {user_id} 删除成功"}
     except NotFoundException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"删除用户失败，用户ID: {user_id}, 错误: {str(e)}")
         raise HTTPException(status_code=500, detail="删除用户失败")
 
 
 @router.get("/me/profile", response_model=UserResponse)
-async def get_my_profile(current_user: User = Depends(get_current_active_user)) -> UserResponse:
+async def get_my_profile(
+    if_none_match: Optional[str] = Header(None), current_user: User = Depends(get_current_active_user)
+) -> Response:
     """
     获取当前用户个人资料
 
     Args:
+        if_none_match: If-None-Match请求头
         current_user: 当前活跃用户
 
     Returns:
-        用户个人资料
+        用户个人资料，ETag未变化时返回304
     """
-    return current_user
+    return user_response(current_user, if_none_match)
 
 
 @router.put("/me/profile", response_model=UserResponse)
 async def update_my_profile(
-    user_update: UserUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
+    user_update: UserUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user),
 ) -> UserResponse:
     """
     更新当前用户个人资料
@@ -260,41 +712,34 @@ async def update_my_profile(
         更新后的用户信息
 
     Raises:
+        NotFoundException: 用户不存在
         ValidationException: 数据验证失败
     """
     try:
-        # 检查用户名唯一性（排除当前用户）
-        if user_update.username:
-            existing_user = (
-                db.query(User).filter(User.username == user_update.username, User.id != current_user.id).first()
-            )
-            if existing_user:
-                raise ValidationException("用户名已存在")
-
-        # 检查邮箱唯一性（排除当前用户）
-        if user_update.email:
-            existing_email = db.query(User).filter(User.email == user_update.email, User.id != current_user.id).first()
-            if existing_email:
-                raise ValidationException("邮箱已存在")
-
-        # 更新用户信息
-        update_data = user_update.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            if field == "password":
-                # 加密新密码
-                hashed_password = get_password_hash(value)
-                setattr(current_user, "hashed_password", hashed_password)
-            else:
-                setattr(current_user, field, value)
+        update_data = await _update_values(user_update)
+
+        # 只更新提交的列，用户名和邮箱的唯一性由数据库约束保证
+        try:
+            db_user = await update_user_row(db, current_user.id, update_data)
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            message = duplicate_user_message(e)
+            if message is None:
+                raise
+            raise ValidationException(message)
+        if not db_user:
+            raise NotFoundException(f"用户ID {current_user.id} 不存在")
 
-        db.commit()
-        db.refresh(current_user)
+        invalidate_principal(current_user.username, db_user.username)
+        await invalidate_user_cache(db_user.id)
+        await mark_user_written(db_user.id, current_user.username, db_user.username)
 
         logger.info(f"用户个人资料更新成功，用户ID: {current_user.id}")
-        return current_user
-    except ValidationException:
+        return db_user
+    except (NotFoundException, ValidationException):
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"用户个人资料更新失败，用户ID: {current_user.id}, 错误: {str(e)}")
         raise HTTPException(status_code=500, detail="个人资料更新失败")
@@ -0,0 +1,115 @@
+"""
+密码哈希成本校准工具
+
+在当前主机上测量不同成本参数下单次密码验证的耗时，推荐不超过目标耗时的
+最大成本。修改配置后，已有用户的哈希会在下次登录时自动按新参数重新计算。
+
+用法:
+    python -m app.calibrate --target-ms 250
+    python -m app.calibrate --scheme argon2 --target-ms 300
+"""
+import argparse
+import statistics
+import sys
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from passlib.hash import argon2, bcrypt
+
+# 校准使用的示例密码
+SAMPLE_PASSWORD = "calibration-password"
+
+
+def measure_verify(handler: Any, samples: int) -> float:
+    """
+    测量单次密码验证的耗时中位数
+
+    Args:
+        handler: 已设置成本参数的passlib哈希处理器
+        samples: 测量次数
+
+    Returns:
+        耗时（秒）
+    """
+    hashed = handler.hash(SAMPLE_PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        handler.verify(SAMPLE_PASSWORD, hashed)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def calibrate(
+    make_handler: Callable[[int], Any], costs: range, target: float, samples: int
+) -> Tuple[List[Tuple[int, float]], Optional[int]]:
+    """
+    依次测量各成本参数，耗时超过目标的两倍后停止
+
+    Args:
+        make_handler: 根据成本参数构造哈希处理器
+        costs: 待测量的成本参数
+        target: 目标验证耗时（秒）
+        samples: 每个参数的测量次数
+
+    Returns:
+        (各参数的测量结果, 推荐的成本参数)
+    """
+    results = []
+    recommended = None
+    for cost in costs:
+        elapsed = measure_verify(make_handler(cost), samples)
+        results.append((cost, elapsed))
+        if elapsed <= target:
+            recommended = cost
+        if elapsed > target * 2:
+            break
+    return results, recommended
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="密码哈希成本校准")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default="bcrypt", help="哈希方案")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="目标单次验证耗时（毫秒）")
+    parser.add_argument("--samples", type=int, default=5, help="每个参数的测量次数")
+    parser.add_argument("--argon2-memory-cost", type=int, default=65536, help="argon2内存开销（KiB）")
+    parser.add_argument("--argon2-parallelism", type=int, default=4, help="argon2并行度")
+    args = parser.parse_args()
+
+    target = args.target_ms / 1000
+    if args.scheme == "bcrypt":
+        setting = "BCRYPT_ROUNDS"
+        results, recommended = calibrate(lambda rounds: bcrypt.using(rounds=rounds), range(8, 20), target, args.samples)
+    else:
+        if not argon2.has_backend():
+            print("❌ 使用argon2需要安装argon2-cffi")
+            sys.exit(1)
+        setting = "ARGON2_TIME_COST"
+        results, recommended = calibrate(
+            lambda time_cost: argon2.using(
+                time_cost=time_cost, memory_cost=args.argon2_memory_cost, parallelism=args.argon2_parallelism
+            ),
+            range(1, 20),
+            target,
+            args.samples,
+        )
+
+    print(f"目标单次验证耗时: {args.target_ms:.0f} ms")
+    for cost, elapsed in results:
+        marker = " <- 推荐" if cost == recommended else ""
+        print(f"  {setting}={cost:<3} {elapsed * 1000:8.1f} ms  单核约 {1 / elapsed:7.1f} 次/秒{marker}")
+
+    if recommended is None:
+        print("⚠️  最低成本参数的耗时也超过目标，请提高目标耗时或使用性能更高的主机")
+        sys.exit(1)
+
+    print("\n推荐配置:")
+    print(f'PASSWORD_SCHEMES=["{args.scheme}"]')
+    print(f"{setting}={recommended}")
+    if args.scheme == "argon2":
+        print(f"ARGON2_MEMORY_COST={args.argon2_memory_cost}")
+        print(f"ARGON2_PARALLELISM={args.argon2_parallelism}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+缓存模块 - 进程内LRU+TTL缓存和响应缓存后端
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class TTLCache:
+    """
+    进程内LRU+TTL缓存
+
+    每个条目有独立的过期时间，超过最大容量时淘汰最久未使用的条目。
+    缓存仅在当前工作进程内有效，多进程部署时各进程独立维护。
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        Args:
+            maxsize: 最大条目数，0表示禁用缓存
+            ttl: 默认过期时间（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """缓存是否启用"""
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        获取缓存值
+
+        Args:
+            key: 缓存键
+            default: 未命中时的返回值
+
+        Returns:
+            缓存值或默认值
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        设置缓存值
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），不超过默认过期时间
+        """
+        if not self.enabled:
+            return
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """删除缓存条目"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+# 回填租约：未命中时先写入租约占位，回填时只有租约仍在才写入。期间发生的失效会删除租约，
+# 使基于失效前数据的回填被放弃。租约值以该前缀开头（缓存值不会以此开头），读取时视为未命中
+LEASE_PREFIX = b"\x00lease:"
+LEASE_TTL = 5.0
+
+# 租约仍在时写入（Redis）
+_SET_IF_LEASED_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3]) and 1 or 0
+end
+return 0
+"""
+
+
+def _new_lease() -> bytes:
+    """生成新的租约值"""
+    return LEASE_PREFIX + os.urandom(8).hex().encode()
+
+
+class CacheBackend:
+    """
+    响应缓存后端基类
+
+    缓存值为字节串。后端不可用时读取视为未命中、写入和删除静默失败，
+    缓存故障不影响请求处理。
+
+    由数据库读取结果回填缓存时使用 lease() 和 set_if_leased()，避免失效之前
+    读到的旧数据在失效之后写回缓存。
+    """
+
+    name = "none"
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """读取缓存值，未命中返回None"""
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """写入缓存值"""
+
+    async def delete(self, *keys: str) -> None:
+        """删除缓存条目"""
+
+    async def lease(self, key: str) -> Optional[bytes]:
+        """
+        获取回填租约，需在读取数据库之前调用
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            租约值，缓存已有值或其他请求持有租约时返回None（此时不应回填）
+        """
+        return None
+
+    async def set_if_leased(self, key: str, lease: bytes, value: bytes, ttl: float) -> bool:
+        """
+        租约仍然有效（期间没有失效）时写入缓存值
+
+        Args:
+            key: 缓存键
+            lease: lease() 返回的租约值
+            value: 缓存值
+            ttl: 过期时间（秒）
+
+        Returns:
+            是否写入
+        """
+        return False
+
+    def _record(self, value: Optional[bytes]) -> Optional[bytes]:
+        """记录命中统计"""
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    进程内缓存后端
+
+    各工作进程独立缓存，失效只作用于当前进程，其他进程最长在TTL后更新。
+    也用作测试中Redis后端的本地替代。
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__()
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self._cache.get(key)
+        if value is not None and value.startswith(LEASE_PREFIX):
+            value = None
+        return self._record(value)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.delete(key)
+
+    async def lease(self, key: str) -> Optional[bytes]:
+        if self._cache.get(key) is not None:
+            return None
+        lease = _new_lease()
+        self._cache.set(key, lease, LEASE_TTL)
+        return lease
+
+    async def set_if_leased(self, key: str, lease: bytes, value: bytes, ttl: float) -> bool:
+        # 同一事件循环内检查和写入之间没有切换，无需加锁
+        if self._cache.get(key) != lease:
+            return False
+        self._cache.set(key, value, ttl)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        cache_stats = self._cache.stats()
+        stats.update(size=cache_stats["size"], evictions=cache_stats["evictions"])
+        return stats
+
+
+# Redis操作可能抛出的异常（连接失败时为OSError）
+REDIS_ERRORS = (redis.RedisError, OSError)
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def get_redis_client() -> redis.Redis:
+    """获取共享的Redis客户端（首次使用时创建，连接按需建立）"""
+    global _redis_client
+
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(
+            settings.REDIS_URL, socket_timeout=settings.REDIS_TIMEOUT, socket_connect_timeout=settings.REDIS_TIMEOUT
+        )
+    return _redis_client
+
+
+async def close_redis_client() -> None:
+    """关闭共享的Redis客户端"""
+    global _redis_client
+
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis缓存后端，多个工作进程和实例共享缓存与失效"""
+
+    name = "redis"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._client = get_redis_client()
+        self._set_if_leased = self._client.register_script(_SET_IF_LEASED_SCRIPT)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = await self._client.get(key)
+            if value is not None and value.startswith(LEASE_PREFIX):
+                value = None
+            return self._record(value)
+        except REDIS_ERRORS as e:
+            self._error("读取", e)
+            self.misses += 1
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            await self._client.set(key, value, px=max(1, int(ttl * 1000)))
+        except REDIS_ERRORS as e:
+            self._error("写入", e)
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        try:
+            await self._client.delete(*keys)
+        except REDIS_ERRORS as e:
+            self._error("删除", e)
+
+    async def lease(self, key: str) -> Optional[bytes]:
+        lease = _new_lease()
+        try:
+            if await self._client.set(key, lease, nx=True, px=int(LEASE_TTL * 1000)):
+                return lease
+        except REDIS_ERRORS as e:
+            self._error("获取租约", e)
+        return None
+
+    async def set_if_leased(self, key: str, lease: bytes, value: bytes, ttl: float) -> bool:
+        try:
+            return bool(await self._set_if_leased(keys=[key], args=[lease, value, max(1, int(ttl * 1000))]))
+        except REDIS_ERRORS as e:
+            self._error("写入", e)
+            return False
+
+    def _error(self, operation: str, error: Exception) -> None:
+        self.errors += 1
+        logger.warning("Redis缓存操作失败", operation=operation, error=str(error))
+
+
+def create_cache_backend(backend: str, maxsize: int, ttl: float) -> CacheBackend:
+    """
+    按配置创建缓存后端
+
+    Args:
+        backend: 后端类型（memory、redis或none）
+        maxsize: 进程内缓存的最大条目数
+        ttl: 进程内缓存的默认过期时间（秒）
+
+    Returns:
+        缓存后端
+    """
+    if backend == "redis":
+        return RedisCacheBackend()
+    if backend == "memory" and maxsize > 0 and ttl > 0:
+        return MemoryCacheBackend(maxsize=maxsize, ttl=ttl)
+    return CacheBackend()
+
+
+# 单个用户响应缓存
+user_cache = create_cache_backend(settings.CACHE_BACKEND, settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+
+
+def user_cache_key(user_id: int) -> str:
+    """单个用户响应的缓存键"""
+    return f"user:{user_id}"
+
+
+async def invalidate_user_cache(*user_ids: Optional[int]) -> None:
+    """
+    使单个用户响应缓存失效
+
+    Args:
+        user_ids: 用户ID，None会被忽略
+    """
+    keys = [user_cache_key(user_id) for user_id in user_ids if user_id is not None]
+    if keys:
+        await user_cache.delete(*keys)
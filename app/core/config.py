@@ -1,7 +1,8 @@
 """
 应用配置管理
 """
-from typing import List, Optional
+import ipaddress
+from typing import Dict, List, Optional
 from pydantic import BaseSettings, validator
 
 
@@ -17,15 +18,69 @@ class Settings(BaseSettings):
     # 服务器配置
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    # 可信反向代理的IP（逗号分隔），只有来自这些地址的请求才按X-Forwarded-For还原客户端IP，
+    # 限流等按客户端IP处理的功能依赖该配置。"*"表示信任所有来源（仅限应用端口不对外暴露时使用）
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
     DEBUG: bool = False
+    WORKERS: int = 0  # 生产模式工作进程数，0表示按CPU核数自动计算
+    WORKERS_PER_CORE: float = 1.0  # 自动计算时每个CPU核的工作进程数
+    MAX_WORKERS: int = 32  # 自动计算时的工作进程数上限，0表示不限制
+    WORKER_MAX_REQUESTS: int = 10000  # 工作进程处理多少个请求后平滑重启，0表示不重启
+    WORKER_MAX_REQUESTS_JITTER: int = 1000  # 重启阈值的随机偏移，使各进程错开重启
+    WORKER_GRACEFUL_TIMEOUT: int = 30  # 重启/停止时等待进行中请求完成的秒数
+    PRELOAD_BACKENDS: bool = True  # 构建应用时预加载密码哈希和JWT后端，启动时预先建立数据库连接
+    STARTUP_BUDGET_MS: int = 3000  # 启动耗时预算（导入应用+生命周期启动），供 start.py --profile-startup 检查
     
     # 安全配置
     SECRET_KEY: str = "your-secret-key-here"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    TOKEN_CACHE_SIZE: int = 10000  # 已验证令牌缓存的最大条目数，0表示禁用
+    TOKEN_CACHE_TTL: int = 300  # 已验证令牌缓存的最长有效秒数
+    PRINCIPAL_CACHE_SIZE: int = 10000  # 当前用户快照缓存的最大条目数，0表示禁用
+    PRINCIPAL_CACHE_TTL: int = 30  # 当前用户快照缓存的有效秒数
+    TOKEN_REVOCATION_BACKEND: str = "memory"  # 令牌撤销记录存储：memory（仅当前进程）或 redis（跨进程共享）
+    LAST_LOGIN_FLUSH_INTERVAL: float = 5.0  # 最后登录时间批量写入间隔秒数（最大延迟），0表示每次登录立即写入
+    LAST_LOGIN_FLUSH_MAX_ENTRIES: int = 1000  # 缓冲的用户数达到该值时提前写入
+    
+    # 响应缓存配置
+    CACHE_BACKEND: str = "memory"  # memory、redis 或 none
+    REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_TIMEOUT: float = 0.5  # Redis连接和读写的超时秒数
+    USER_CACHE_SIZE: int = 10000  # 进程内单个用户响应缓存的最大条目数
+    USER_CACHE_TTL: int = 60  # 单个用户响应缓存的有效秒数
+    
+    # 登录限流配置（滑动窗口，次数为0表示不限流）
+    RATE_LIMIT_BACKEND: str = "memory"  # memory（每个工作进程独立计数）或 redis（集群共享计数）
+    LOGIN_IP_LIMIT: int = 20  # 单个IP在窗口内允许的登录请求数
+    LOGIN_IP_WINDOW: int = 60  # IP限流窗口秒数
+    LOGIN_USERNAME_LIMIT: int = 5  # 单个用户名在窗口内允许的登录失败次数
+    LOGIN_USERNAME_WINDOW: int = 300  # 用户名限流窗口秒数
+    
+    # 密码哈希配置（可通过 python -m app.calibrate 按目标耗时校准）
+    PASSWORD_SCHEMES: List[str] = ["bcrypt"]  # 第一个用于新密码，其余仅用于验证旧哈希，登录时自动迁移
+    BCRYPT_ROUNDS: int = 12  # bcrypt成本因子，每加1耗时翻倍
+    ARGON2_TIME_COST: int = 3  # argon2迭代次数
+    ARGON2_MEMORY_COST: int = 65536  # argon2内存开销（KiB）
+    ARGON2_PARALLELISM: int = 4  # argon2并行度
+    
+    # 密码哈希工作池配置
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # thread 或 process
+    PASSWORD_HASH_WORKERS: int = 0  # 0 表示按CPU核数自动确定
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # 排队等待的最大任务数
+    PASSWORD_HASH_TIMEOUT: float = 5.0  # 单次哈希/验证的最长等待秒数
     
     # 数据库配置
     DATABASE_URL: str = "sqlite:///./app.db"
+    DB_POOL_SIZE: int = 5  # 连接池常驻连接数（SQLite不生效）
+    DB_MAX_OVERFLOW: int = 10  # 超出常驻连接数后允许临时创建的连接数
+    DB_POOL_TIMEOUT: float = 30.0  # 获取连接的最长等待秒数
+    DB_POOL_RECYCLE: int = 1800  # 连接最长存活秒数，超过后重建
+    DB_POOL_PRE_PING: bool = True  # 取出连接前检测连接是否可用（应对故障切换后的失效连接）
+    DATABASE_REPLICA_URLS: List[str] = []  # 只读副本URL（JSON数组），为空时全部读写使用主库
+    DB_REPLICA_STRATEGY: str = "round_robin"  # 副本选择策略：round_robin 或 least_connections
+    DB_REPLICA_HEALTH_INTERVAL: float = 5.0  # 副本健康检查间隔秒数
+    DB_REPLICA_STICKY_SECONDS: float = 5.0  # 记录写入后对其读取使用主库的秒数（应大于复制延迟）
     
     # CORS配置
     ALLOWED_HOSTS: List[str] = ["*"]
@@ -33,11 +88,28 @@ class Settings(BaseSettings):
     # 日志配置
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "json"
+    LOG_QUEUE_SIZE: int = 10000  # 待写出日志队列的最大条数，队列满时丢弃新日志，0表示不限制
+    # 日志采样规则，键为"日志记录器:级别"或"日志记录器"（"*"匹配全部），值为"1/N"或"K/s"
+    LOG_SAMPLING_RULES: Dict[str, str] = {}
+    
+    # 请求耗时分解配置（Server-Timing）
+    SERVER_TIMING_SAMPLE_RATE: float = 0.01  # 采样率（默认1%的请求），0表示关闭
+    SERVER_TIMING_LOG: bool = False  # 是否为采样请求输出耗时日志
+    # 只向这些网段的客户端返回Server-Timing响应头（耗时可能泄露用户名是否存在等信息），为空时只记录日志
+    SERVER_TIMING_TRUSTED_NETWORKS: List[str] = ["127.0.0.1/32", "::1/128"]
+    
+    # 监控端点访问控制（/metrics、/internal/db-pool）：来自可信网段或携带抓取令牌的请求可以访问
+    METRICS_TRUSTED_NETWORKS: List[str] = ["127.0.0.1/32", "::1/128"]
+    METRICS_TOKEN: Optional[str] = None  # 抓取令牌（Authorization: Bearer <令牌>），为空时只按网段限制
     
     # 分页配置
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
     
+    # 批量导入导出配置
+    BULK_IMPORT_BATCH_SIZE: int = 500  # 每批校验和插入的行数
+    EXPORT_BATCH_SIZE: int = 1000  # 导出时服务端游标每批读取的行数
+    
     @validator("SECRET_KEY")
     def validate_secret_key(cls, v: str) -> str:
         """验证密钥长度"""
@@ -45,6 +117,94 @@ class Settings(BaseSettings):
             raise ValueError("SECRET_KEY长度必须至少32个字符")
         return v
     
+    @validator("WORKERS", "MAX_WORKERS", "WORKER_MAX_REQUESTS", "WORKER_MAX_REQUESTS_JITTER", "WORKER_GRACEFUL_TIMEOUT")
+    def validate_worker_settings(cls, v: int) -> int:
+        """验证工作进程配置"""
+        if v < 0:
+            raise ValueError("工作进程配置不能为负数")
+        return v
+    
+    @validator("WORKERS_PER_CORE")
+    def validate_workers_per_core(cls, v: float) -> float:
+        """验证每个CPU核的工作进程数"""
+        if v <= 0:
+            raise ValueError("WORKERS_PER_CORE必须大于0")
+        return v
+    
+    @validator("PASSWORD_SCHEMES")
+    def validate_password_schemes(cls, v: List[str]) -> List[str]:
+        """验证密码哈希方案"""
+        if not v or any(scheme not in ("bcrypt", "argon2") for scheme in v):
+            raise ValueError("PASSWORD_SCHEMES只能包含bcrypt和argon2，且不能为空")
+        return v
+    
+    @validator("BCRYPT_ROUNDS")
+    def validate_bcrypt_rounds(cls, v: int) -> int:
+        """验证bcrypt成本因子"""
+        if not 4 <= v <= 31:
+            raise ValueError("BCRYPT_ROUNDS必须在4到31之间")
+        return v
+    
+    @validator("PASSWORD_HASH_EXECUTOR")
+    def validate_password_hash_executor(cls, v: str) -> str:
+        """验证密码哈希执行器类型"""
+        if v not in ("thread", "process"):
+            raise ValueError("PASSWORD_HASH_EXECUTOR必须是thread或process")
+        return v
+    
+    @validator("CACHE_BACKEND")
+    def validate_cache_backend(cls, v: str) -> str:
+        """验证缓存后端类型"""
+        if v not in ("memory", "redis", "none"):
+            raise ValueError("CACHE_BACKEND必须是memory、redis或none")
+        return v
+    
+    @validator("RATE_LIMIT_BACKEND")
+    def validate_rate_limit_backend(cls, v: str) -> str:
+        """验证限流计数后端类型"""
+        if v not in ("memory", "redis"):
+            raise ValueError("RATE_LIMIT_BACKEND必须是memory或redis")
+        return v
+    
+    @validator("TOKEN_REVOCATION_BACKEND")
+    def validate_token_revocation_backend(cls, v: str) -> str:
+        """验证令牌撤销存储类型"""
+        if v not in ("memory", "redis"):
+            raise ValueError("TOKEN_REVOCATION_BACKEND必须是memory或redis")
+        return v
+    
+    @validator("LAST_LOGIN_FLUSH_INTERVAL")
+    def validate_last_login_flush_interval(cls, v: float) -> float:
+        """验证最后登录时间写入间隔"""
+        if v < 0:
+            raise ValueError("LAST_LOGIN_FLUSH_INTERVAL不能小于0")
+        return v
+    
+    @validator("LAST_LOGIN_FLUSH_MAX_ENTRIES")
+    def validate_last_login_flush_max_entries(cls, v: int) -> int:
+        """验证最后登录时间缓冲条数"""
+        if v < 1:
+            raise ValueError("LAST_LOGIN_FLUSH_MAX_ENTRIES必须大于0")
+        return v
+    
+    @validator("LOG_SAMPLING_RULES")
+    def validate_log_sampling_rules(cls, v: Dict[str, str]) -> Dict[str, str]:
+        """验证日志采样规则格式"""
+        for key, rule in v.items():
+            count, _, unit = rule.partition("/")
+            if not (count.isdigit() and (unit == "s" or (count == "1" and unit.isdigit() and int(unit) >= 1))):
+                raise ValueError(f"无效的日志采样规则 {key}: {rule}，应为1/N或K/s")
+        return v
+    
+    @validator("SERVER_TIMING_TRUSTED_NETWORKS", "METRICS_TRUSTED_NETWORKS", each_item=True)
+    def validate_trusted_networks(cls, v: str) -> str:
+        """验证可信网段格式"""
+        try:
+            ipaddress.ip_network(v, strict=False)
+        except ValueError:
+            raise ValueError(f"无效的网段: {v}")
+        return v
+    
     @validator("DATABASE_URL")
     def validate_database_url(cls, v: str) -> str:
         """验证数据库URL格式"""
@@ -52,6 +212,20 @@ class Settings(BaseSettings):
             raise ValueError("不支持的数据库类型")
         return v
     
+    @validator("DATABASE_REPLICA_URLS", each_item=True)
+    def validate_database_replica_urls(cls, v: str) -> str:
+        """验证只读副本URL格式"""
+        if not v.startswith(("sqlite://", "postgresql://", "mysql://")):
+            raise ValueError("不支持的数据库类型")
+        return v
+    
+    @validator("DB_REPLICA_STRATEGY")
+    def validate_db_replica_strategy(cls, v: str) -> str:
+        """验证副本选择策略"""
+        if v not in ("round_robin", "least_connections"):
+            raise ValueError("DB_REPLICA_STRATEGY必须是round_robin或least_connections")
+        return v
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -2,27 +2,112 @@
 依赖注入模块 - 用户认证和权限验证
 """
 
-from typing import Generator, Optional
+import hmac
+import ipaddress
+from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
-from app.database.database import get_db
+from app.database.database import get_async_db, get_read_db, mark_written, use_primary_if_written
 from app.models.user import User
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.security import verify_token
-from app.core.logging import logger
+from app.core.timing import timed
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
 
 # OAuth2密码Bearer
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", scheme_name="JWT")
 
+# 令牌可选的OAuth2密码Bearer（未携带令牌时返回None）
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", scheme_name="JWT", auto_error=False)
+
+# 唯一约束冲突的错误信息特征（SQLite、PostgreSQL、MySQL）
+UNIQUE_VIOLATION_MARKERS = ("unique constraint failed", "violates unique constraint", "duplicate entry")
+
+# 当前用户快照缓存（键为用户名，仅在当前工作进程内有效）
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL)
+
+
+def _snapshot_user(user: User) -> dict:
+    """获取用户对象的列值快照"""
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+
+def _user_from_snapshot(snapshot: dict) -> User:
+    """
+    由快照重建用户对象
+
+    每次返回新的游离（detached）对象，请求之间互不影响；
+    需要修改用户时应在当前会话中重新加载。
+    """
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+def invalidate_principal(*usernames: Optional[str]) -> None:
+    """
+    使当前用户快照缓存失效
+
+    用户信息、状态或权限变更后必须调用，确保变更立即生效。
+
+    Args:
+        usernames: 用户名（可包含修改前后的用户名）
+    """
+    for username in usernames:
+        if username:
+            principal_cache.delete(username)
+
+
+async def mark_user_written(user_id: Optional[int], *usernames: Optional[str]) -> None:
+    """
+    记录用户写入，粘滞期内对该用户的读取（按ID查询、按用户名查找认证主体）使用主库
+
+    Args:
+        user_id: 用户ID
+        usernames: 用户名（可包含修改前后的用户名）
+    """
+    keys = [f"user:{user_id}"] if user_id is not None else []
+    keys += [f"username:{username}" for username in usernames if username]
+    await mark_written(*keys)
+
+
+async def get_principal(username: str, db: AsyncSession) -> Optional[User]:
+    """
+    根据用户名获取认证主体，优先使用快照缓存
+
+    Args:
+        username: 用户名
+        db: 异步数据库会话
+
+    Returns:
+        用户对象或None
+    """
+    snapshot = principal_cache.get(username)
+    if snapshot is not None:
+        return _user_from_snapshot(snapshot)
+
+    await use_primary_if_written(db, f"username:{username}")
+    user = await get_user_by_username(username, db)
+    if user is not None:
+        principal_cache.set(username, _snapshot_user(user))
+    return user
+
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+async def get_current_user(db: AsyncSession = Depends(get_read_db), token: str = Depends(oauth2_scheme)) -> User:
     """
     获取当前用户
 
     Args:
-        db: 数据库会话
+        db: 只读数据库会话
         token: JWT访问令牌
 
     Returns:
@@ -31,40 +116,41 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     Raises:
         HTTPException: 认证失败
     """
-    try:
-        # 验证令牌
-        payload = verify_token(token, "access")
-        username: str = payload.get("sub")
-
-        if username is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="无法验证凭据",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        # 查找用户
-        user = db.query(User).filter(User.username == username).first()
-        if user is None:
+    with timed("auth"):
+        try:
+            # 验证令牌
+            payload = verify_token(token, "access")
+            username: str = payload.get("sub")
+
+            if username is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="无法验证凭据",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+
+            # 查找用户
+            user = await get_principal(username, db)
+            if user is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="用户不存在",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+
+            logger.debug("获取当前用户成功", username=username)
+            return user
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"获取当前用户失败: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="用户不存在",
+                detail="认证失败",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        logger.debug(f"获取当前用户成功: {username}")
-        return user
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"获取当前用户失败: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="认证失败",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
 
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """
@@ -104,14 +190,45 @@ def get_current_superuser(current_user: User = Depends(get_current_user)) -> Use
     return current_user
 
 
-def get_optional_current_user(
-    db: Session = Depends(get_db), token: Optional[str] = Depends(oauth2_scheme)
+def require_metrics_access(request: Request) -> None:
+    """
+    监控端点访问控制
+
+    来自 METRICS_TRUSTED_NETWORKS 的客户端（位于可信代理之后时为代理头还原的地址）
+    或携带 METRICS_TOKEN 抓取令牌的请求可以访问。
+
+    Args:
+        request: 请求对象
+
+    Raises:
+        HTTPException: 客户端不在可信网段且未携带有效的抓取令牌
+    """
+    if settings.METRICS_TOKEN:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+            return
+
+    host = request.client.host if request.client else None
+    try:
+        address = ipaddress.ip_address(host) if host else None
+    except ValueError:
+        address = None
+    networks = [ipaddress.ip_network(network, strict=False) for network in settings.METRICS_TRUSTED_NETWORKS]
+    if address is not None and any(address in network for network in networks):
+        return
+
+    logger.warning("拒绝访问监控端点", client=host, path=request.url.path)
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="禁止访问")
+
+
+async def get_optional_current_user(
+    db: AsyncSession = Depends(get_read_db), token: Optional[str] = Depends(oauth2_scheme)
 ) -> Optional[User]:
     """
     获取可选的当前用户（不强制要求认证）
 
     Args:
-        db: 数据库会话
+        db: 只读数据库会话
         token: 可选的JWT访问令牌
 
     Returns:
@@ -127,69 +244,153 @@ def get_optional_current_user(
         if username is None:
             return None
 
-        user = db.query(User).filter(User.username == username).first()
+        user = await get_principal(username, db)
         if user is None or not user.is_active:
             return None
 
-        logger.debug(f"获取可选当前用户成功: {username}")
+        logger.debug("获取可选当前用户成功", username=username)
         return user
 
     except Exception as e:
-        logger.debug(f"获取可选当前用户失败: {str(e)}")
+        logger.debug("获取可选当前用户失败", error=str(e))
         return None
 
 
-def get_user_by_username(username: str, db: Session = Depends(get_db)) -> Optional[User]:
+async def get_user_by_username(username: str, db: AsyncSession = Depends(get_async_db)) -> Optional[User]:
     """
     根据用户名获取用户
 
     Args:
         username: 用户名
-        db: 数据库会话
+        db: 异步数据库会话
 
     Returns:
         用户对象或None
     """
-    return db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
 
 
-def get_user_by_email(email: str, db: Session = Depends(get_db)) -> Optional[User]:
+async def get_user_by_email(email: str, db: AsyncSession = Depends(get_async_db)) -> Optional[User]:
     """
     根据邮箱获取用户
 
     Args:
         email: 邮箱地址
-        db: 数据库会话
+        db: 异步数据库会话
 
     Returns:
         用户对象或None
     """
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+
+def duplicate_user_message(error: IntegrityError) -> Optional[str]:
+    """
+    根据唯一约束冲突的数据库错误信息给出提示
+
+    只识别唯一约束冲突（非空等其他约束错误返回None）。SQLite的错误信息包含列名
+    （users.username），PostgreSQL和MySQL包含索引名（ix_users_username）。
+
+    Args:
+        error: 写入用户时的完整性错误
+
+    Returns:
+        "用户名已存在"、"邮箱已存在"，不是用户名或邮箱的唯一约束冲突时返回None
+    """
+    detail = str(error.orig).lower()
+    if not any(marker in detail for marker in UNIQUE_VIOLATION_MARKERS):
+        return None
+    if "users.username" in detail or "ix_users_username" in detail:
+        return "用户名已存在"
+    if "users.email" in detail or "ix_users_email" in detail:
+        return "邮箱已存在"
+    return None
 
 
-def authenticate_user(username: str, password: str, db: Session = Depends(get_db)) -> Optional[User]:
+async def insert_user(db: AsyncSession, values: dict) -> User:
+    """
+    插入用户并通过RETURNING取回完整记录（含服务端默认值），唯一性由数据库约束保证
+
+    Args:
+        db: 异步数据库会话
+        values: 列值
+
+    Returns:
+        新用户对象
+
+    Raises:
+        IntegrityError: 用户名或邮箱已存在
+    """
+    if db.get_bind().dialect.insert_returning:
+        return await db.scalar(insert(User).values(**values).returning(User))
+    # 不支持RETURNING的数据库（如MySQL）按主键再查询一次
+    result = await db.execute(insert(User).values(**values))
+    return await db.get(User, result.inserted_primary_key[0])
+
+
+async def update_user_row(db: AsyncSession, user_id: int, values: dict) -> Optional[User]:
+    """
+    只更新给定的列并通过RETURNING取回更新后的记录，唯一性由数据库约束保证
+
+    Args:
+        db: 异步数据库会话
+        user_id: 用户ID
+        values: 需要更新的列值，为空时只查询用户
+
+    Returns:
+        更新后的用户对象，用户不存在时返回None
+
+    Raises:
+        IntegrityError: 用户名或邮箱已存在
+    """
+    if not values:
+        return await db.get(User, user_id)
+    statement = update(User).where(User.id == user_id).values(**values)
+    if db.get_bind().dialect.update_returning:
+        return await db.scalar(statement.returning(User))
+    # 不支持RETURNING的数据库（如MySQL）按主键再查询一次
+    result = await db.execute(statement)
+    if not result.rowcount:
+        return None
+    return await db.get(User, user_id)
+
+
+async def authenticate_user(username: str, password: str, db: AsyncSession = Depends(get_async_db)) -> Optional[User]:
     """
     用户认证
 
+    密码验证通过且存储的哈希使用了过期的方案或成本参数时，
+    用本次提交的密码重新哈希并保存。
+
     Args:
         username: 用户名
         password: 密码
-        db: 数据库会话
+        db: 异步数据库会话
 
     Returns:
         认证成功的用户对象或None
     """
-    from app.core.security import verify_password
+    from app.core.security import verify_and_update_password_async
 
-    user = get_user_by_username(username, db)
+    user = await get_user_by_username(username, db)
     if not user:
         return None
 
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    if not verified:
         return None
 
     if not user.is_active:
         return None
 
-    logger.debug(f"用户认证成功: {username}")
+    # 哈希方案或成本参数已变更时，用本次登录的明文密码重新哈希
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
+        invalidate_principal(username)
+        logger.info("用户密码哈希已更新", username=username)
+
+    logger.debug("用户认证成功", username=username)
     return user
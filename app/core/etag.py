@@ -0,0 +1,94 @@
+"""
+ETag模块 - 用户资源的弱ETag和条件GET
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+
+from fastapi import Response
+
+from app.core.responses import json_response, user_to_dict
+from app.models.user import User
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _version(updated_at: Optional[datetime]) -> int:
+    """将更新时间转换为微秒时间戳，无时区的时间按UTC处理"""
+    if updated_at is None:
+        return 0
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return (updated_at - _EPOCH) // timedelta(microseconds=1)
+
+
+def user_etag(user_id: int, updated_at: Optional[datetime]) -> str:
+    """
+    生成单个用户的弱ETag
+
+    Args:
+        user_id: 用户ID
+        updated_at: 用户更新时间
+
+    Returns:
+        弱ETag
+    """
+    return f'W/"{user_id}-{_version(updated_at):x}"'
+
+
+def list_etag(rows: Iterable[Tuple[int, Optional[datetime]]], variant: str = "") -> str:
+    """
+    生成用户列表页的弱ETag
+
+    Args:
+        rows: 页内各用户的 (ID, 更新时间)
+        variant: 响应形式标识，不同形式的响应体使用不同的ETag
+
+    Returns:
+        弱ETag
+    """
+    digest = hashlib.blake2b(variant.encode(), digest_size=12)
+    for user_id, updated_at in rows:
+        digest.update(f"|{user_id}-{_version(updated_at):x}".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    按弱比较判断If-None-Match是否命中
+
+    Args:
+        if_none_match: If-None-Match请求头
+        etag: 当前ETag
+
+    Returns:
+        是否命中
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """返回304响应"""
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def user_response(user: User, if_none_match: Optional[str] = None) -> Response:
+    """
+    返回带ETag的用户响应，If-None-Match命中时返回304
+
+    Args:
+        user: 用户对象
+        if_none_match: If-None-Match请求头
+
+    Returns:
+        用户JSON响应或304响应
+    """
+    etag = user_etag(user.id, user.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return json_response(user_to_dict(user), headers={"ETag": etag})
@@ -4,11 +4,14 @@
 from typing import Any, Dict, Optional
 
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
-from app.core.logging import logger
+from app.core.logging import get_logger
+from app.core.responses import ORJSONResponse
+
+logger = get_logger(__name__)
 
 
 class CustomHTTPException(HTTPException):
@@ -60,7 +63,19 @@ class NotFoundException(CustomHTTPException):
         super().__init__(status_code=404, detail=detail, error_code="NOT_FOUND")
 
 
-async def http_exception_handler(request: Request, exc: CustomHTTPException) -> JSONResponse:
+class RateLimitException(CustomHTTPException):
+    """请求频率超限异常"""
+    
+    def __init__(self, retry_after: int, detail: str = "请求过于频繁，请稍后再试"):
+        super().__init__(
+            status_code=429,
+            detail=detail,
+            error_code="RATE_LIMITED",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+async def http_exception_handler(request: Request, exc: CustomHTTPException) -> ORJSONResponse:
     """自定义HTTP异常处理器"""
     logger.error(
         "HTTP异常",
@@ -70,7 +85,7 @@ async def http_exception_handler(request: Request, exc: CustomHTTPException) ->
         path=request.url.path,
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": {
@@ -83,27 +98,41 @@ async def http_exception_handler(request: Request, exc: CustomHTTPException) ->
     )
 
 
-async def validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
+async def validation_exception_handler(request: Request, exc: RequestValidationError) -> ORJSONResponse:
     """请求验证异常处理器"""
+    # 错误详情中可能包含异常对象等不可直接序列化的值
+    errors = jsonable_encoder(exc.errors())
     logger.error(
         "请求验证失败",
-        errors=exc.errors(),
+        errors=errors,
         path=request.url.path,
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={
             "error": {
                 "code": "VALIDATION_ERROR",
                 "message": "请求数据验证失败",
-                "details": exc.errors(),
+                "details": errors,
             }
         },
     )
 
 
-async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+async def starlette_http_exception_handler(request: Request, exc: StarletteHTTPException) -> ORJSONResponse:
+    """Starlette HTTP异常处理器（如路由不存在、方法不允许）"""
+    return await http_exception_handler(
+        request,
+        CustomHTTPException(
+            status_code=exc.status_code,
+            detail=exc.detail,
+            headers=exc.headers,
+        ),
+    )
+
+
+async def general_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
     """通用异常处理器"""
     logger.error(
         "未处理的异常",
@@ -113,7 +142,7 @@ async def general_exception_handler(request: Request, exc: Exception) -> JSONRes
         exc_info=True,
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": {
@@ -133,14 +162,4 @@ def setup_exception_handlers(app: FastAPI) -> None:
     app.add_exception_handler(Exception, general_exception_handler)
     
     # 处理Starlette的HTTPException
-    app.add_exception_handler(
-        StarletteHTTPException,
-        lambda request, exc: http_exception_handler(
-            request,
-            CustomHTTPException(
-                status_code=exc.status_code,
-                detail=exc.detail,
-                headers=exc.headers,
-            )
-        ),
-    ) 
\ No newline at end of file
+    app.add_exception_handler(StarletteHTTPException, starlette_http_exception_handler)
@@ -0,0 +1,137 @@
+"""
+最后登录时间写入缓冲
+
+登录时只在进程内记录用户的最后登录时间（同一用户只保留最新的一条），
+由后台任务每隔 LAST_LOGIN_FLUSH_INTERVAL 秒或积累 LAST_LOGIN_FLUSH_MAX_ENTRIES
+条记录时，用一条批量UPDATE写入数据库，避免登录高峰时对users表的逐条提交。
+应用关闭时写入剩余的记录。写入后使这些用户的缓存和当前用户快照失效。
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, update
+
+from app.core.cache import invalidate_user_cache
+from app.core.config import settings
+from app.core.deps import invalidate_principal
+from app.core.logging import get_logger
+from app.database.database import async_engine
+from app.models.user import User
+
+logger = get_logger(__name__)
+
+# 按主键批量更新最后登录时间（executemany）
+UPDATE_LAST_LOGIN = (
+    update(User.__table__).where(User.__table__.c.id == bindparam("user_id")).values(last_login=bindparam("login_at"))
+)
+
+
+class LastLoginBuffer:
+    """最后登录时间写入缓冲"""
+
+    def __init__(self, interval: float, max_entries: int):
+        """
+        Args:
+            interval: 写入间隔秒数（即最后登录时间的最大延迟），0表示每次登录立即写入
+            max_entries: 积累多少个用户的记录时提前写入
+        """
+        self.interval = interval
+        self.max_entries = max_entries
+        # 用户ID -> (用户名, 登录时间)，用户名用于使按用户名缓存的当前用户快照失效
+        self._pending: Dict[int, Tuple[str, datetime]] = {}
+        self._full = asyncio.Event()
+        self._stopping = False
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """等待写入的用户数"""
+        return len(self._pending)
+
+    def _merge(self, entries: Dict[int, Tuple[str, datetime]]) -> None:
+        """合并记录，同一用户只保留最新的登录时间"""
+        for user_id, (username, login_at) in entries.items():
+            current = self._pending.get(user_id)
+            if current is None or login_at > current[1]:
+                self._pending[user_id] = (username, login_at)
+
+    async def record(self, user_id: int, username: str, login_at: datetime) -> None:
+        """
+        记录用户的最后登录时间
+
+        Args:
+            user_id: 用户ID
+            username: 用户名
+            login_at: 登录时间
+        """
+        self._merge({user_id: (username, login_at)})
+        if self.interval <= 0:
+            await self.flush()
+        elif len(self._pending) >= self.max_entries:
+            self._full.set()
+
+    async def flush(self) -> int:
+        """
+        将缓冲的记录写入数据库
+
+        写入失败时记录放回缓冲区，下次写入时重试。
+
+        Returns:
+            写入的用户数
+        """
+        if not self._pending:
+            return 0
+        entries, self._pending = self._pending, {}
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(
+                    UPDATE_LAST_LOGIN,
+                    [{"user_id": user_id, "login_at": login_at} for user_id, (_, login_at) in entries.items()],
+                )
+        except Exception as e:
+            self._merge(entries)
+            logger.error("最后登录时间写入失败，稍后重试", users=len(entries), error=str(e))
+            return 0
+        except BaseException:
+            # 写入被取消时放回缓冲区，由之后的写入处理
+            self._merge(entries)
+            raise
+
+        await invalidate_user_cache(*entries)
+        invalidate_principal(*(username for username, _ in entries.values()))
+        logger.debug("最后登录时间已写入", users=len(entries))
+        return len(entries)
+
+    async def _flush_loop(self) -> None:
+        """定期或缓冲区满时写入，stop() 请求停止后在当前写入完成时退出"""
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        """启动后台写入任务"""
+        if self.interval > 0 and self._flusher is None:
+            self._stopping = False
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """
+        停止后台写入任务并写入剩余的记录
+
+        不取消后台任务，而是通知其退出并等待正在进行的写入完成，避免已从缓冲区
+        取出的记录丢失。
+        """
+        if self._flusher is not None:
+            self._stopping = True
+            self._full.set()
+            await self._flusher
+            self._flusher = None
+        await self.flush()
+
+
+last_login_buffer = LastLoginBuffer(settings.LAST_LOGIN_FLUSH_INTERVAL, settings.LAST_LOGIN_FLUSH_MAX_ENTRIES)
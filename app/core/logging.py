@@ -1,53 +1,246 @@
 """
 日志配置模块
+
+日志记录在调用线程中只做结构化处理并放入队列，实际写出由后台线程
+（QueueListener）完成，stdout或管道阻塞时不会拖慢事件循环。
 """
+import atexit
 import logging
+import os
+import queue
 import sys
-from typing import Any, Dict
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Mapping, Optional, Tuple
 
+import orjson
 import structlog
 from app.core.config import settings
 
 
+class _DroppingQueueHandler(QueueHandler):
+    """队列已满时丢弃日志并计数，而不是阻塞调用方"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# 实际写出日志的处理器，由后台监听线程调用
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(logging.Formatter("%(message)s"))
+_queue_handler = _DroppingQueueHandler(queue.Queue())
+_listener: Optional[QueueListener] = None
+_hooks_registered = False
+
+
+def _orjson_dumps(obj: Any, **kwargs: Any) -> str:
+    """JSONRenderer的序列化函数，无法序列化的值转为字符串"""
+    return orjson.dumps(obj, default=str).decode("utf-8")
+
+
+def _start_listener() -> None:
+    """创建新的日志队列并启动后台写日志线程"""
+    global _listener
+
+    _queue_handler.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _listener = QueueListener(_queue_handler.queue, _stream_handler)
+    _listener.start()
+
+
+def _restart_listener_in_child() -> None:
+    """
+    fork后的子进程中没有父进程的后台线程，父进程的队列也可能处于加锁状态，
+    因此重新创建队列和监听器（如gunicorn预加载应用后fork出的worker）
+    """
+    if _listener is not None:
+        _start_listener()
+
+
+# 始终输出、不参与采样的日志级别
+_UNSAMPLED_LEVELS = frozenset({"error", "exception", "critical", "fatal"})
+
+
+class LogSampler:
+    """
+    按事件采样/限流的structlog处理器
+
+    规则以"日志记录器:级别"或"日志记录器"为键（日志记录器按层级向上匹配，
+    "*"匹配全部），值为"1/N"（每N条输出1条）或"K/s"（每秒最多输出K条）。
+    计数按（日志记录器, 级别, 事件）分别进行；限流模式下，被抑制的条数会在
+    下一条输出的日志中以suppressed字段给出。error及以上级别始终输出。
+    """
+
+    # 最多跟踪的事件数，超过后清空计数，防止事件文本含变量时无限增长
+    MAX_KEYS = 10000
+
+    def __init__(self, rules: Mapping[str, str]):
+        """
+        Args:
+            rules: 采样规则
+        """
+        self.rules = {key: self.parse_rule(value) for key, value in rules.items()}
+        self._resolved: Dict[Tuple[str, str], Optional[Tuple[str, int]]] = {}
+        self._state: Dict[Tuple[str, str, str], list] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_rule(value: str) -> Tuple[str, int]:
+        """
+        解析采样规则
+
+        Args:
+            value: "1/N"或"K/s"
+
+        Returns:
+            ("ratio", N) 或 ("rate", K)
+
+        Raises:
+            ValueError: 规则格式无效
+        """
+        count, _, unit = value.strip().partition("/")
+        try:
+            if unit == "s" and int(count) >= 0:
+                return "rate", int(count)
+            if count == "1" and int(unit) >= 1:
+                return "ratio", int(unit)
+        except ValueError:
+            pass
+        raise ValueError(f"无效的日志采样规则: {value}")
+
+    def _resolve(self, logger_name: str, level: str) -> Optional[Tuple[str, int]]:
+        """查找日志记录器和级别对应的规则，结果按（日志记录器, 级别）缓存"""
+        key = (logger_name, level)
+        if key not in self._resolved:
+            rule = None
+            name = logger_name
+            while rule is None:
+                rule = self.rules.get(f"{name}:{level}") or self.rules.get(name)
+                if name == "*":
+                    break
+                name = name.rpartition(".")[0] or "*"
+            self._resolved[key] = rule
+        return self._resolved[key]
+
+    def __call__(self, logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if method_name in _UNSAMPLED_LEVELS or not self.rules:
+            return event_dict
+
+        logger_name = getattr(logger, "name", "")
+        rule = self._resolve(logger_name, method_name)
+        if rule is None:
+            return event_dict
+
+        mode, value = rule
+        key = (logger_name, method_name, str(event_dict.get("event")))
+        with self._lock:
+            if len(self._state) >= self.MAX_KEYS and key not in self._state:
+                self._state.clear()
+            # state: [计数, 窗口开始时间, 被抑制条数]
+            state = self._state.setdefault(key, [0, 0.0, 0])
+
+            if mode == "ratio":
+                state[0] += 1
+                if (state[0] - 1) % value:
+                    raise structlog.DropEvent
+                if value > 1:
+                    event_dict["sample_rate"] = value
+                return event_dict
+
+            now = time.monotonic()
+            if now - state[1] >= 1.0:
+                state[0], state[1] = 0, now
+            if state[0] >= value:
+                state[2] += 1
+                raise structlog.DropEvent
+            state[0] += 1
+            if state[2]:
+                event_dict["suppressed"] = state[2]
+                state[2] = 0
+            return event_dict
+
+
 def setup_logging() -> None:
     """设置应用日志配置"""
-    
+    global _hooks_registered
+
+    level = getattr(logging, settings.LOG_LEVEL.upper())
+
     # 配置structlog
+    # 使用按级别过滤的BoundLogger，未启用级别的调用直接返回，不执行任何处理器
+    # 采样处理器位于最前，被丢弃的事件不再执行后续处理器
     structlog.configure(
         processors=[
-            structlog.stdlib.filter_by_level,
+            LogSampler(settings.LOG_SAMPLING_RULES),
             structlog.stdlib.add_logger_name,
             structlog.stdlib.add_log_level,
-            structlog.stdlib.PositionalArgumentsFormatter(),
             structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer() if settings.LOG_FORMAT == "json" 
-            else structlog.dev.ConsoleRenderer(),
+            (
+                structlog.processors.JSONRenderer(serializer=_orjson_dumps)
+                if settings.LOG_FORMAT == "json"
+                else structlog.dev.ConsoleRenderer()
+            ),
         ],
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.stdlib.BoundLogger,
+        wrapper_class=structlog.make_filtering_bound_logger(level),
         cache_logger_on_first_use=True,
     )
-    
-    # 配置标准库logging
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=getattr(logging, settings.LOG_LEVEL.upper()),
-    )
-    
+
+    # 配置标准库logging，根日志记录器只向队列写入
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    if _listener is None:
+        root_logger.removeHandler(_stream_handler)
+        _start_listener()
+        root_logger.addHandler(_queue_handler)
+
+    if not _hooks_registered:
+        _hooks_registered = True
+        atexit.register(shutdown_logging)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_restart_listener_in_child)
+
     # 设置第三方库的日志级别
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
 
 
+def shutdown_logging() -> None:
+    """
+    停止后台写日志线程并写出队列中剩余的日志
+
+    之后的日志改为在调用线程中直接写出，保证关闭过程中的日志不会丢失。
+    """
+    global _listener
+
+    if _listener is None:
+        return
+
+    root_logger = logging.getLogger()
+    root_logger.addHandler(_stream_handler)
+    root_logger.removeHandler(_queue_handler)
+    _listener.stop()
+    _listener = None
+
+
+def get_dropped_log_count() -> int:
+    """获取因队列已满而丢弃的日志条数"""
+    return _queue_handler.dropped
+
+
 def get_logger(name: str) -> structlog.BoundLogger:
     """获取结构化日志记录器"""
     return structlog.get_logger(name)
 
 
 # 创建默认日志记录器
-logger = get_logger(__name__) 
\ No newline at end of file
+logger = get_logger(__name__)
@@ -0,0 +1,185 @@
+"""
+监控指标模块 - Prometheus指标采集和导出
+
+多进程部署（gunicorn多worker）时，需在启动前设置环境变量
+PROMETHEUS_MULTIPROC_DIR 指向一个空目录，各worker的指标会写入该目录并在
+/metrics 中聚合输出。
+"""
+import os
+import time
+from typing import Any, Iterable
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily, Metric
+from prometheus_client.multiprocess import MultiProcessCollector
+from prometheus_client.registry import Collector
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# 请求指标
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "HTTP请求总数",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP请求耗时（秒）",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "正在处理的HTTP请求数",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+# 数据库会话指标
+DB_SESSIONS = Counter("db_sessions_total", "数据库会话创建总数", ["kind"])
+DB_SESSIONS_ACTIVE = Gauge(
+    "db_sessions_active",
+    "当前打开的数据库会话数",
+    ["kind"],
+    multiprocess_mode="livesum",
+)
+
+# 密码哈希指标
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "密码哈希/验证耗时（含排队等待，秒）",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+class RuntimeStatsCollector(Collector):
+    """
+    进程内运行状态采集器
+
+    在抓取时读取各组件的统计信息（密码哈希工作池、令牌缓存、
+    当前用户缓存、用户响应缓存、日志队列、数据库连接池），不在请求路径上产生开销。
+    多进程模式下只反映处理本次抓取的worker，并带有pid标签。
+    """
+
+    def describe(self) -> Iterable[Metric]:
+        """注册时不预先采集（各组件此时可能尚未初始化）"""
+        return []
+
+    def collect(self) -> Iterable[Metric]:
+        from app.core.cache import user_cache
+        from app.core.deps import principal_cache
+        from app.core.logging import get_dropped_log_count
+        from app.core.security import password_hash_pool, token_cache
+        from app.database.database import get_pool_stats
+
+        pid = str(os.getpid())
+        base_labels = ["pid"] if MULTIPROCESS else []
+        base_values = [pid] if MULTIPROCESS else []
+
+        pool_stats = password_hash_pool.stats()
+        for key in ("pending", "submitted", "completed", "rejected", "timeouts", "failed", "total_wait_seconds"):
+            metric = GaugeMetricFamily(f"password_hash_pool_{key}", f"密码哈希工作池{key}", labels=base_labels)
+            metric.add_metric(base_values, pool_stats[key])
+            yield metric
+
+        cache_stats = {
+            "token": token_cache.stats(),
+            "principal": principal_cache.stats(),
+            "user": user_cache.stats(),
+        }
+        for key in ("size", "hits", "misses", "evictions", "errors", "hit_ratio"):
+            metric = GaugeMetricFamily(f"cache_{key}", f"缓存{key}", labels=["cache"] + base_labels)
+            for cache_name, stats in cache_stats.items():
+                if key in stats:
+                    metric.add_metric([cache_name] + base_values, stats[key])
+            yield metric
+
+        metric = GaugeMetricFamily("log_records_dropped", "日志队列已满时丢弃的日志条数", labels=base_labels)
+        metric.add_metric(base_values, get_dropped_log_count())
+        yield metric
+
+        db_stats = get_pool_stats()
+        for key in (
+            "checked_out",
+            "overflow",
+            "size",
+            "checkouts",
+            "connects",
+            "invalidations",
+            "timeouts",
+            "checkout_seconds_total",
+            "healthy",
+        ):
+            metric = GaugeMetricFamily(f"db_pool_{key}", f"数据库连接池{key}", labels=["engine"] + base_labels)
+            for engine_name, stats in db_stats.items():
+                if key in stats:
+                    metric.add_metric([engine_name] + base_values, stats[key])
+            yield metric
+
+
+def render_metrics() -> tuple:
+    """
+    生成Prometheus文本格式指标
+
+    Returns:
+        (指标内容, Content-Type)
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        registry.register(RuntimeStatsCollector())
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+if not MULTIPROCESS:
+    REGISTRY.register(RuntimeStatsCollector())
+
+
+class MetricsMiddleware:
+    """
+    请求指标中间件（纯ASGI实现，避免BaseHTTPMiddleware的额外开销）
+
+    路由标签使用路由模板（如 /api/v1/users/{user_id}），避免标签基数膨胀。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            route: Any = scope.get("route")
+            route_path = getattr(route, "path", "<unmatched>")
+            status = str(status_code)
+            REQUEST_COUNT.labels(method, route_path, status).inc()
+            REQUEST_LATENCY.labels(method, route_path, status).observe(time.perf_counter() - start)
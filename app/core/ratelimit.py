@@ -0,0 +1,135 @@
+"""
+限流模块 - 滑动窗口计数限流
+
+使用滑动窗口计数算法：按固定窗口计数，并以上一窗口计数按剩余比例加权
+估算最近一个窗口内的请求数，每个键只需保存两个计数。计数可保存在进程内
+（每个工作进程独立限流）或Redis中（集群共享限流）。
+"""
+import math
+import threading
+import time
+from typing import Dict, Tuple
+
+from app.core.cache import REDIS_ERRORS, get_redis_client
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class MemoryRateLimitBackend:
+    """进程内限流计数"""
+
+    # 超过该键数时清理过期计数
+    MAX_KEYS = 100000
+
+    def __init__(self) -> None:
+        # 键 -> [窗口序号, 当前窗口计数, 上一窗口计数]
+        self._counters: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    async def incr(self, key: str, window: int, index: int, cost: int) -> Tuple[int, int]:
+        """
+        增加当前窗口计数
+
+        Args:
+            key: 限流键
+            window: 窗口长度（秒）
+            index: 当前窗口序号
+            cost: 增加的计数，0表示只读取
+
+        Returns:
+            (当前窗口计数, 上一窗口计数)
+        """
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                if len(self._counters) >= self.MAX_KEYS:
+                    self._prune(index)
+                counter = self._counters[key] = [index, 0, 0]
+            elif counter[0] != index:
+                previous = counter[1] if counter[0] == index - 1 else 0
+                counter[:] = [index, 0, previous]
+
+            counter[1] += cost
+            return counter[1], counter[2]
+
+    def _prune(self, index: int) -> None:
+        """清理两个窗口以前的计数"""
+        for key in [key for key, counter in self._counters.items() if counter[0] < index - 1]:
+            del self._counters[key]
+
+
+class RedisRateLimitBackend:
+    """Redis限流计数，Redis不可用时放行"""
+
+    async def incr(self, key: str, window: int, index: int, cost: int) -> Tuple[int, int]:
+        client = get_redis_client()
+        current_key = f"ratelimit:{key}:{index}"
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.incrby(current_key, cost)
+                pipe.expire(current_key, window * 2)
+                pipe.get(f"ratelimit:{key}:{index - 1}")
+                current, _, previous = await pipe.execute()
+        except REDIS_ERRORS as e:
+            logger.warning("Redis限流计数失败", error=str(e))
+            return 0, 0
+        return int(current), int(previous or 0)
+
+
+def create_rate_limit_backend(backend: str):
+    """按配置创建限流计数后端"""
+    if backend == "redis":
+        return RedisRateLimitBackend()
+    return MemoryRateLimitBackend()
+
+
+rate_limit_backend = create_rate_limit_backend(settings.RATE_LIMIT_BACKEND)
+
+
+class SlidingWindowLimiter:
+    """滑动窗口限流器"""
+
+    def __init__(self, name: str, limit: int, window: int):
+        """
+        Args:
+            name: 限流器名称，用作计数键前缀
+            limit: 窗口内允许的最大次数，0表示不限流
+            window: 窗口长度（秒）
+        """
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    async def hit(self, key: str, cost: int = 1) -> int:
+        """
+        记录一次请求并判断是否超出限制
+
+        Args:
+            key: 限流键（如客户端IP、用户名）
+            cost: 本次计入的次数，0表示只检查不计数
+
+        Returns:
+            需要等待的秒数，0表示允许
+        """
+        if self.limit <= 0:
+            return 0
+
+        now = time.time()
+        index = int(now // self.window)
+        elapsed = now - index * self.window
+        current, previous = await rate_limit_backend.incr(f"{self.name}:{key}", self.window, index, cost)
+
+        # 包含本次请求在内的滑动窗口估算次数
+        estimated = previous * (self.window - elapsed) / self.window + current - cost + max(cost, 1)
+        if estimated <= self.limit:
+            return 0
+        return max(1, math.ceil(self.window - elapsed))
+
+
+# 登录限流：按客户端IP统计全部登录请求，按用户名统计失败的登录
+login_ip_limiter = SlidingWindowLimiter("login_ip", settings.LOGIN_IP_LIMIT, settings.LOGIN_IP_WINDOW)
+login_username_limiter = SlidingWindowLimiter(
+    "login_username", settings.LOGIN_USERNAME_LIMIT, settings.LOGIN_USERNAME_WINDOW
+)
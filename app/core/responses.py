@@ -0,0 +1,59 @@
+"""
+响应模块 - 基于orjson的JSON响应和预校验数据快速通道
+"""
+from typing import Any, Dict
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from app.models.user import User
+from app.schemas.user import UserResponse
+
+# 用户响应字段，与UserResponse保持一致
+USER_RESPONSE_FIELDS = tuple(UserResponse.model_fields)
+
+# orjson序列化选项（UTC时间输出为"Z"后缀），其他直接序列化响应数据的地方应使用相同选项
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    基于orjson的JSON响应
+
+    原生支持datetime等类型；UTC时间输出为"Z"后缀，与pydantic的序列化结果一致。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def user_to_dict(user: User) -> Dict[str, Any]:
+    """
+    将用户对象转换为UserResponse字段字典
+
+    数据来自数据库中已校验的记录，跳过pydantic校验。
+
+    Args:
+        user: 用户对象
+
+    Returns:
+        用户字段字典
+    """
+    return {field: getattr(user, field) for field in USER_RESPONSE_FIELDS}
+
+
+def json_response(content: Any, **kwargs: Any) -> ORJSONResponse:
+    """
+    直接返回预校验数据的JSON响应
+
+    端点返回Response对象时FastAPI不会再按response_model校验和序列化，
+    因此只应用于字段已与response_model一致的数据。
+
+    Args:
+        content: 响应内容
+        **kwargs: 传给ORJSONResponse的其他参数
+
+    Returns:
+        JSON响应
+    """
+    return ORJSONResponse(content=content, **kwargs)
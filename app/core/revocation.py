@@ -0,0 +1,141 @@
+"""
+令牌撤销模块
+
+已撤销令牌的jti保存在进程内字典中，验证令牌时只做一次字典查找。
+使用Redis后端时，撤销记录同时写入Redis（随令牌exp过期）并通过发布订阅
+通知其他工作进程；各进程启动时从Redis加载尚未过期的撤销记录。
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+import redis.asyncio as redis
+
+from app.core.cache import REDIS_ERRORS, get_redis_client
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Redis键前缀和发布订阅频道
+REVOKED_KEY_PREFIX = "revoked:"
+REVOCATION_CHANNEL = "token_revocations"
+
+
+class RevocationStore:
+    """已撤销令牌存储"""
+
+    # 每新增多少条记录清理一次已过期的记录
+    PRUNE_INTERVAL = 1000
+
+    def __init__(self, backend: str):
+        """
+        Args:
+            backend: memory（仅当前进程）或 redis（跨进程共享）
+        """
+        self.backend = backend
+        self._revoked: Dict[str, float] = {}
+        self._added = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    def is_revoked(self, jti: str) -> bool:
+        """
+        判断令牌是否已撤销
+
+        Args:
+            jti: 令牌ID
+
+        Returns:
+            是否已撤销
+        """
+        return jti in self._revoked
+
+    def _add(self, jti: str, exp: float) -> None:
+        """记录已撤销的令牌，并定期清理已过期的记录"""
+        self._revoked[jti] = exp
+        self._added += 1
+        if self._added % self.PRUNE_INTERVAL == 0:
+            now = time.time()
+            for key in [key for key, value in self._revoked.items() if value <= now]:
+                del self._revoked[key]
+
+    async def revoke(self, jti: str, exp: float) -> bool:
+        """
+        撤销令牌（检查并设置为原子操作）
+
+        并发撤销同一令牌时只有一个调用返回True，可用于保证令牌只能使用一次。
+        使用Redis后端时通过SET NX在所有工作进程之间判定；Redis不可用时
+        退化为只在当前进程内判定。
+
+        Args:
+            jti: 令牌ID
+            exp: 令牌过期时间戳，撤销记录在此之后失效
+
+        Returns:
+            是否由本次调用撤销（已撤销或已过期时返回False）
+        """
+        ttl = exp - time.time()
+        if ttl <= 0 or self.is_revoked(jti):
+            return False
+
+        self._add(jti, exp)
+        if self.backend != "redis":
+            return True
+
+        try:
+            client = get_redis_client()
+            if not await client.set(f"{REVOKED_KEY_PREFIX}{jti}", str(exp), px=max(1, int(ttl * 1000)), nx=True):
+                # 其他工作进程已撤销
+                return False
+            await client.publish(REVOCATION_CHANNEL, f"{jti}:{exp}")
+        except REDIS_ERRORS as e:
+            logger.error("令牌撤销记录写入Redis失败", jti=jti, error=str(e))
+        return True
+
+    async def _load(self, client: redis.Redis) -> None:
+        """从Redis加载尚未过期的撤销记录"""
+        keys = [key async for key in client.scan_iter(match=f"{REVOKED_KEY_PREFIX}*", count=1000)]
+        for start in range(0, len(keys), 1000):
+            batch = keys[start : start + 1000]
+            for key, exp in zip(batch, await client.mget(batch)):
+                if exp is not None:
+                    self._add(key.decode()[len(REVOKED_KEY_PREFIX) :], float(exp))
+
+    async def _listen(self) -> None:
+        """订阅撤销通知，连接断开后重新订阅并重新加载"""
+        # 订阅连接长时间空闲，使用不设读超时的独立连接
+        client = redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=settings.REDIS_TIMEOUT)
+        try:
+            while True:
+                try:
+                    async with client.pubsub() as pubsub:
+                        await pubsub.subscribe(REVOCATION_CHANNEL)
+                        # 先订阅再加载，避免遗漏两者之间的撤销
+                        await self._load(client)
+                        async for message in pubsub.listen():
+                            if message["type"] == "message":
+                                jti, _, exp = message["data"].decode().rpartition(":")
+                                self._add(jti, float(exp))
+                except REDIS_ERRORS as e:
+                    logger.warning("令牌撤销订阅中断，稍后重试", error=str(e))
+                    await asyncio.sleep(1)
+        finally:
+            await client.aclose()
+
+    async def start(self) -> None:
+        """启动撤销通知订阅（Redis后端）"""
+        if self.backend == "redis" and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """停止撤销通知订阅"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+revocation_store = RevocationStore(settings.TOKEN_REVOCATION_BACKEND)
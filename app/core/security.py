@@ -2,18 +2,102 @@
 安全模块 - JWT认证和密码加密
 """
 
+import asyncio
+import hashlib
+import math
+import os
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Callable, Dict, List, Tuple, Union, Optional
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.logging import logger
+from app.core.logging import get_logger
+from app.core.metrics import PASSWORD_HASH_DURATION
+from app.core.revocation import revocation_store
+from app.core.timing import record_timing
+
+logger = get_logger(__name__)
+
+
+def build_password_context(
+    schemes: List[str], bcrypt_rounds: int, argon2_time_cost: int, argon2_memory_cost: int, argon2_parallelism: int
+) -> CryptContext:
+    """
+    构造密码加密上下文
+
+    第一个方案用于新密码，其余方案只用于验证旧哈希。哈希方案不是首选方案、
+    或成本参数与配置不一致时，needs_update返回True，登录时会自动重新哈希。
+
+    Args:
+        schemes: 哈希方案列表（bcrypt、argon2）
+        bcrypt_rounds: bcrypt成本因子
+        argon2_time_cost: argon2迭代次数
+        argon2_memory_cost: argon2内存开销（KiB）
+        argon2_parallelism: argon2并行度
+
+    Returns:
+        密码加密上下文
+
+    Raises:
+        RuntimeError: 配置了argon2但未安装argon2-cffi
+    """
+    options: Dict[str, Any] = {}
+    if "bcrypt" in schemes:
+        options.update(
+            bcrypt__default_rounds=bcrypt_rounds,
+            bcrypt__min_desired_rounds=bcrypt_rounds,
+            bcrypt__max_desired_rounds=bcrypt_rounds,
+        )
+    if "argon2" in schemes:
+        from passlib.hash import argon2
+
+        if not argon2.has_backend():
+            raise RuntimeError("使用argon2需要安装argon2-cffi")
+        options.update(
+            argon2__time_cost=argon2_time_cost,
+            argon2__memory_cost=argon2_memory_cost,
+            argon2__parallelism=argon2_parallelism,
+        )
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
 
 # 密码加密上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = build_password_context(
+    settings.PASSWORD_SCHEMES,
+    settings.BCRYPT_ROUNDS,
+    settings.ARGON2_TIME_COST,
+    settings.ARGON2_MEMORY_COST,
+    settings.ARGON2_PARALLELISM,
+)
+
+
+def preload_backends() -> None:
+    """
+    预加载密码哈希和JWT后端
+
+    passlib在首次哈希/验证时才加载并自检bcrypt等后端，jose在首次签名和验证时
+    才构造密钥对象；在构建应用时完成这些工作，首个登录请求不再承担这部分耗时。
+    """
+    for scheme in pwd_context.schemes():
+        handler = pwd_context.handler(scheme)
+        if hasattr(handler, "get_backend"):
+            handler.get_backend()
+    jwt.decode(
+        jwt.encode({"sub": "preload"}, settings.SECRET_KEY, algorithm=settings.ALGORITHM),
+        settings.SECRET_KEY,
+        algorithms=[settings.ALGORITHM],
+    )
+
+
+# 已验证令牌缓存（键为令牌摘要，值为解码后的载荷）
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
 
 
 def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -32,11 +116,11 @@ def create_access_token(subject: Union[str, Any], expires_delta: Optional[timede
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode = {"exp": expire, "sub": str(subject), "type": "access"}
+    to_encode = {"exp": expire, "sub": str(subject), "type": "access", "jti": uuid.uuid4().hex}
 
     try:
         encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-        logger.debug(f"创建访问令牌成功，用户: {subject}")
+        logger.debug("创建访问令牌成功", subject=subject)
         return encoded_jwt
     except Exception as e:
         logger.error(f"创建访问令牌失败: {str(e)}")
@@ -60,11 +144,11 @@ def create_refresh_token(subject: Union[str, Any], expires_delta: Optional[timed
         # 刷新令牌有效期更长，默认7天
         expire = datetime.utcnow() + timedelta(days=7)
 
-    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh"}
+    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh", "jti": uuid.uuid4().hex}
 
     try:
         encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-        logger.debug(f"创建刷新令牌成功，用户: {subject}")
+        logger.debug("创建刷新令牌成功", subject=subject)
         return encoded_jwt
     except Exception as e:
         logger.error(f"创建刷新令牌失败: {str(e)}")
@@ -86,7 +170,7 @@ def verify_token(token: str, token_type: str = "access") -> dict:
         HTTPException: 令牌无效或过期
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = _decode_token(token)
 
         # 验证令牌类型
         if payload.get("type") != token_type:
@@ -97,9 +181,16 @@ def verify_token(token: str, token_type: str = "access") -> dict:
         if subject is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="令牌无效")
 
-        logger.debug(f"令牌验证成功，用户: {subject}")
+        # 检查令牌是否已撤销（进程内查找，不访问数据库或Redis）
+        jti = payload.get("jti")
+        if jti is not None and revocation_store.is_revoked(jti):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="令牌已被撤销")
+
+        logger.debug("令牌验证成功", subject=subject)
         return payload
 
+    except HTTPException:
+        raise
     except JWTError as e:
         logger.warning(f"JWT令牌验证失败: {str(e)}")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="令牌无效或已过期")
@@ -108,6 +199,58 @@ def verify_token(token: str, token_type: str = "access") -> dict:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="令牌验证失败")
 
 
+def _decode_token(token: str) -> dict:
+    """
+    解码并校验令牌签名，同一令牌在缓存有效期内只校验一次
+
+    Args:
+        token: JWT令牌
+
+    Returns:
+        解码后的令牌数据
+
+    Raises:
+        JWTError: 令牌无效或已过期
+    """
+    if not token_cache.enabled:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+    cache_key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(cache_key)
+    if payload is None:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+        # 缓存条目不晚于令牌的exp过期
+        exp = payload.get("exp")
+        ttl = exp - time.time() if exp is not None else None
+        token_cache.set(cache_key, payload, ttl)
+
+    return dict(payload)
+
+
+async def revoke_token(token: str) -> bool:
+    """
+    撤销令牌，撤销记录在令牌过期后自动失效
+
+    Args:
+        token: JWT令牌
+
+    Returns:
+        是否由本次调用撤销（令牌无效、已过期、不含jti或已被撤销时返回False）
+    """
+    try:
+        payload = _decode_token(token)
+    except JWTError:
+        return False
+
+    jti = payload.get("jti")
+    exp = payload.get("exp")
+    if jti is None or exp is None:
+        return False
+
+    return await revocation_store.revoke(jti, exp)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     验证密码
@@ -126,6 +269,24 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    验证密码，并在哈希方案或成本参数过期时计算新的哈希值
+
+    Args:
+        plain_password: 明文密码
+        hashed_password: 加密密码
+
+    Returns:
+        (密码是否匹配, 新的哈希值或None)
+    """
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except Exception as e:
+        logger.error(f"密码验证失败: {str(e)}")
+        return False, None
+
+
 def get_password_hash(password: str) -> str:
     """
     获取密码哈希值
@@ -143,6 +304,201 @@ def get_password_hash(password: str) -> str:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="密码加密失败")
 
 
+def _timed_call(func: Callable[..., Any], submitted_at: float, *args: Any) -> tuple:
+    """在工作线程/进程中执行函数，并返回结果及排队等待时间"""
+    queue_wait = time.monotonic() - submitted_at
+    return func(*args), queue_wait
+
+
+class PasswordHashPool:
+    """
+    密码哈希工作池
+
+    bcrypt每次调用耗时数百毫秒，直接在协程中执行会阻塞整个事件循环。
+    该工作池将哈希/验证任务提交到线程池（bcrypt计算期间会释放GIL）或进程池，
+    并限制排队深度和等待时间，同时记录调用指标。
+    """
+
+    def __init__(self, executor_type: str, max_workers: int, max_queue: int, timeout: float):
+        self.executor_type = executor_type
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+        # 运行指标
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failed = 0
+        self.max_pending = 0
+        self.total_wait_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        """延迟创建执行器，避免在导入阶段（或fork之前）创建线程/进程"""
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """
+        在工作池中执行函数
+
+        Args:
+            func: 要执行的函数（进程池模式下必须可被pickle）
+            *args: 函数参数
+            timeout: 等待秒数，默认使用工作池配置
+
+        Returns:
+            函数返回值
+
+        Raises:
+            HTTPException: 队列已满或等待超时
+        """
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            logger.warning(f"密码哈希队列已满，当前排队数: {self._pending}")
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="服务繁忙，请稍后重试")
+
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        self.submitted += 1
+        self.max_pending = max(self.max_pending, self._pending)
+        start = time.monotonic()
+        try:
+            future = loop.run_in_executor(self._get_executor(), _timed_call, func, start, *args)
+            result, queue_wait = await asyncio.wait_for(future, timeout=timeout or self.timeout)
+            self.completed += 1
+            self.total_wait_seconds += queue_wait
+            return result
+        except asyncio.TimeoutError:
+            # 已提交的任务无法中断，只是不再等待其结果
+            self.timeouts += 1
+            logger.warning(f"密码哈希等待超时，超时时间: {timeout or self.timeout}秒")
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="服务繁忙，请稍后重试")
+        except HTTPException:
+            self.failed += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            self._pending -= 1
+            self.total_seconds += elapsed
+            PASSWORD_HASH_DURATION.labels(func.__name__.lstrip("_")).observe(elapsed)
+            record_timing("hash", elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取工作池运行指标"""
+        return {
+            "executor": self.executor_type,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "failed": self.failed,
+            "total_wait_seconds": self.total_wait_seconds,
+            "total_seconds": self.total_seconds,
+        }
+
+    def shutdown(self) -> None:
+        """关闭工作池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局密码哈希工作池
+password_hash_pool = PasswordHashPool(
+    executor_type=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    timeout=settings.PASSWORD_HASH_TIMEOUT,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    在工作池中验证密码，不阻塞事件循环
+
+    Args:
+        plain_password: 明文密码
+        hashed_password: 加密密码
+
+    Returns:
+        密码是否匹配
+    """
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    在工作池中验证密码，并在需要时计算新的哈希值
+
+    Args:
+        plain_password: 明文密码
+        hashed_password: 加密密码
+
+    Returns:
+        (密码是否匹配, 新的哈希值或None)
+    """
+    return await password_hash_pool.run(verify_and_update_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    在工作池中计算密码哈希值，不阻塞事件循环
+
+    Args:
+        password: 明文密码
+
+    Returns:
+        加密后的密码
+    """
+    return await password_hash_pool.run(get_password_hash, password)
+
+
+def _hash_many(passwords: List[str]) -> List[str]:
+    """批量计算密码哈希值（在工作线程/进程中执行）"""
+    return [get_password_hash(password) for password in passwords]
+
+
+async def hash_passwords_async(passwords: List[str]) -> List[str]:
+    """
+    批量计算密码哈希值
+
+    将密码分片后并行提交到工作池，每个分片只占用一个排队名额；
+    工作线程/进程多于一个时保留一个给登录等交互请求。
+
+    Args:
+        passwords: 明文密码列表
+
+    Returns:
+        与输入顺序一致的加密密码列表
+    """
+    if not passwords:
+        return []
+
+    parallelism = max(1, password_hash_pool.max_workers - 1)
+    size = math.ceil(len(passwords) / parallelism)
+    chunks = [passwords[i : i + size] for i in range(0, len(passwords), size)]
+    results = await asyncio.gather(
+        *(
+            password_hash_pool.run(_hash_many, chunk, timeout=password_hash_pool.timeout * len(chunk))
+            for chunk in chunks
+        )
+    )
+    return [hashed for chunk in results for hashed in chunk]
+
+
 def get_token_expiration(token: str) -> Optional[datetime]:
     """
     获取令牌过期时间
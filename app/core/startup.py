@@ -0,0 +1,159 @@
+"""
+应用启动耗时分析
+
+记录构建应用和生命周期启动各阶段的耗时，并提供启动耗时分析命令：在子进程
+中以 -X importtime 导入应用并完成一次启动，输出按顶层包汇总的导入耗时和
+各启动阶段的耗时，合计超过启动预算时以非零状态码退出。
+
+分析命令的子进程在导入应用之前先执行本模块，因此本模块只依赖标准库。
+
+用法:
+    python start.py --profile-startup
+    python -m app.core.startup --top 20 --budget-ms 1500
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+# 子进程输出分析结果时使用的行前缀
+RESULT_PREFIX = "STARTUP_PROFILE "
+
+# 阶段名称 -> 耗时（秒）
+_phases: Dict[str, float] = {}
+
+
+@contextmanager
+def startup_phase(name: str) -> Iterator[None]:
+    """
+    记录一个启动阶段的耗时
+
+    Args:
+        name: 阶段名称
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = _phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def get_startup_phases() -> Dict[str, float]:
+    """获取已记录的启动阶段耗时（秒）"""
+    return dict(_phases)
+
+
+def parse_importtime(output: str) -> Tuple[float, Dict[str, float]]:
+    """
+    解析 -X importtime 的输出
+
+    Args:
+        output: 子进程的标准错误输出
+
+    Returns:
+        (总导入耗时, 顶层包 -> 该包所有模块自身耗时之和)，单位为秒
+    """
+    packages: Dict[str, float] = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        # 跳过表头行
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        package = fields[2].strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(fields[0]) / 1e6
+    return sum(packages.values()), packages
+
+
+def _run_child() -> None:
+    """子进程：导入应用并完成一次启动和关闭，将各阶段耗时输出到标准输出"""
+    import asyncio
+
+    start = time.perf_counter()
+    from app.main import app
+
+    imported = time.perf_counter()
+
+    async def run_lifespan() -> float:
+        begin = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            started = time.perf_counter()
+        return started - begin
+
+    startup = asyncio.run(run_lifespan())
+    # 以 -m 运行时本文件是__main__模块，阶段耗时记录在应用导入的 app.core.startup 中
+    from app.core.startup import get_startup_phases as get_app_phases
+
+    result = {"import": imported - start, "startup": startup, "phases": get_app_phases()}
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+def profile_startup(top: int, budget_ms: float) -> int:
+    """
+    分析应用启动耗时并打印结果
+
+    Args:
+        top: 显示导入耗时最多的包的数量
+        budget_ms: 启动预算（毫秒），导入应用和生命周期启动的合计耗时不应超过该值
+
+    Returns:
+        退出状态码，超过预算或分析失败时为1
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "app.core.startup", "--child"],
+        capture_output=True,
+        text=True,
+    )
+    result: Optional[dict] = None
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX) :])
+    if process.returncode != 0 or result is None:
+        print("❌ 启动分析失败:")
+        print(process.stderr[-4000:])
+        return 1
+
+    import_total, packages = parse_importtime(process.stderr)
+    print(f"📦 导入耗时（按顶层包汇总，共 {import_total * 1000:.1f} ms，含解释器启动）")
+    for package, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"   {package:<28}{seconds * 1000:>9.1f} ms  {seconds / import_total * 100:5.1f}%")
+
+    print("\n⚙️  启动阶段")
+    print(f"   {'导入 app.main':<28}{result['import'] * 1000:>9.1f} ms")
+    print(f"   {'生命周期启动':<28}{result['startup'] * 1000:>9.1f} ms")
+    for name, seconds in result["phases"].items():
+        print(f"     {name:<26}{seconds * 1000:>9.1f} ms")
+
+    total_ms = (result["import"] + result["startup"]) * 1000
+    if total_ms > budget_ms:
+        print(f"\n❌ 启动耗时 {total_ms:.1f} ms，超过预算 {budget_ms:.0f} ms")
+        return 1
+    print(f"\n✅ 启动耗时 {total_ms:.1f} ms，预算 {budget_ms:.0f} ms")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="应用启动耗时分析")
+    parser.add_argument("--top", type=int, default=15, help="显示导入耗时最多的包的数量")
+    parser.add_argument("--budget-ms", type=float, help="启动预算（毫秒），默认使用STARTUP_BUDGET_MS配置")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child()
+        return
+
+    budget_ms = args.budget_ms
+    if budget_ms is None:
+        from app.core.config import settings
+
+        budget_ms = settings.STARTUP_BUDGET_MS
+    sys.exit(profile_startup(args.top, budget_ms))
+
+
+if __name__ == "__main__":
+    main()
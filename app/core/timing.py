@@ -0,0 +1,226 @@
+"""
+请求耗时分解模块 - Server-Timing响应头
+
+按阶段（auth、db、hash、serialize）累计单个请求的耗时，通过 Server-Timing
+响应头返回，并可选输出一条结构化日志。按 SERVER_TIMING_SAMPLE_RATE 采样，
+未采样的请求不做任何计时。
+
+各阶段耗时会泄露服务端行为（如登录时用户不存在则没有hash阶段），响应头只返回给
+SERVER_TIMING_TRUSTED_NETWORKS 中的客户端，其他客户端的耗时只写入日志。
+"""
+import asyncio
+import functools
+import ipaddress
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class RequestTimings:
+    """单个请求的分阶段耗时"""
+
+    __slots__ = ("phases", "endpoint_end")
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = {}
+        self.endpoint_end: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        """累加阶段耗时"""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def header_value(self, total: float) -> str:
+        """生成Server-Timing响应头的值（毫秒）"""
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+# 当前请求的耗时记录（未采样时为None）
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """
+    记录当前请求某阶段的耗时
+
+    Args:
+        name: 阶段名称
+        seconds: 耗时（秒）
+    """
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """
+    计时上下文管理器，将代码块耗时累加到当前请求的指定阶段
+
+    Args:
+        name: 阶段名称
+    """
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    为数据库引擎注册SQL执行计时事件
+
+    Args:
+        engine: 同步引擎（异步引擎传入其sync_engine）
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        context._timing_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        start = getattr(context, "_timing_start", None)
+        if start is not None:
+            record_timing("db", time.perf_counter() - start)
+
+
+def _mark_endpoint_end(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """包装端点函数，记录端点返回的时刻，用于计算响应序列化耗时"""
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            timings = _request_timings.get()
+            if timings is not None:
+                timings.endpoint_end = time.perf_counter()
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    记录响应序列化耗时的路由类
+
+    serialize阶段为端点返回到响应对象生成之间的耗时，
+    包括response_model校验和JSON编码。
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = _mark_endpoint_end(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            response = await handler(request)
+            timings = _request_timings.get()
+            if timings is not None and timings.endpoint_end is not None:
+                timings.add("serialize", time.perf_counter() - timings.endpoint_end)
+                timings.endpoint_end = None
+            return response
+
+        return timed_handler
+
+
+class ServerTimingMiddleware:
+    """
+    Server-Timing中间件（纯ASGI实现）
+
+    按采样率为请求开启分阶段计时，向可信网段的客户端在响应头中输出各阶段耗时。
+    """
+
+    def __init__(self, app: ASGIApp, trusted_networks: Optional[List[str]] = None):
+        """
+        Args:
+            app: ASGI应用
+            trusted_networks: 可以收到Server-Timing响应头的客户端网段，默认使用配置
+        """
+        self.app = app
+        if trusted_networks is None:
+            trusted_networks = settings.SERVER_TIMING_TRUSTED_NETWORKS
+        self.trusted_networks = [ipaddress.ip_network(network, strict=False) for network in trusted_networks]
+
+    def is_trusted(self, scope: Scope) -> bool:
+        """
+        判断客户端是否可以收到Server-Timing响应头
+
+        Args:
+            scope: ASGI请求范围（位于可信代理之后时，客户端地址已由代理头还原）
+
+        Returns:
+            客户端地址是否位于可信网段
+        """
+        client = scope.get("client")
+        if not client or not self.trusted_networks:
+            return False
+        try:
+            address = ipaddress.ip_address(client[0])
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_networks)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or random.random() >= settings.SERVER_TIMING_SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+
+        trusted = self.is_trusted(scope)
+        if not trusted and not settings.SERVER_TIMING_LOG:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+        total = 0.0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, total
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total = time.perf_counter() - start
+                if trusted:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.header_value(total))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
+            if settings.SERVER_TIMING_LOG:
+                logger.info(
+                    "请求耗时",
+                    method=scope["method"],
+                    path=scope["path"],
+                    status_code=status_code,
+                    total_ms=round(total * 1000, 2),
+                    **{f"{name}_ms": round(seconds * 1000, 2) for name, seconds in timings.phases.items()},
+                )
@@ -1,25 +1,371 @@
 """
 数据库连接和会话管理
 """
-from typing import Generator
+import asyncio
+import itertools
+import time
+from typing import Any, AsyncGenerator, Dict, Generator, List, Optional, Type
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, ExceptionContext
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
 
+from app.core.cache import create_cache_backend
 from app.core.config import settings
-from app.core.logging import logger
+from app.core.logging import get_logger
+from app.core.metrics import DB_SESSIONS, DB_SESSIONS_ACTIVE
+from app.core.timing import instrument_engine
+
+logger = get_logger(__name__)
+
+
+class PoolMetrics:
+    """连接池指标"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+        self.pool: Pool = None
+
+    @property
+    def in_use(self) -> int:
+        """当前借出的连接数"""
+        return self.checkouts - self.checkins
+
+    def record_checkout(self, seconds: float) -> None:
+        """记录一次连接获取耗时（含排队等待、预检和新建连接）"""
+        self.checkout_seconds_total += seconds
+        self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+
+    def listen(self, engine: Engine) -> None:
+        """注册连接池事件"""
+        self.pool = engine.pool
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(*args: Any) -> None:
+            self.checkouts += 1
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(*args: Any) -> None:
+            self.checkins += 1
+
+        @event.listens_for(engine, "connect")
+        def on_connect(*args: Any) -> None:
+            self.connects += 1
+
+        @event.listens_for(engine, "invalidate")
+        def on_invalidate(*args: Any) -> None:
+            self.invalidations += 1
+
+        @event.listens_for(engine, "engine_disposed")
+        def on_disposed(*args: Any) -> None:
+            self.pool = engine.pool
+
+    def stats(self) -> Dict[str, Any]:
+        """获取连接池指标快照"""
+        stats: Dict[str, Any] = {
+            "pool_class": type(self.pool).__name__,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "checkout_seconds_total": self.checkout_seconds_total,
+            "checkout_seconds_max": self.checkout_seconds_max,
+        }
+        if isinstance(self.pool, QueuePool):
+            stats.update(
+                size=self.pool.size(),
+                checked_in=self.pool.checkedin(),
+                checked_out=self.pool.checkedout(),
+                overflow=self.pool.overflow(),
+            )
+        return stats
+
+
+# 各引擎的连接池指标
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def _timed_pool_class(base: Type[QueuePool], metrics: PoolMetrics) -> Type[QueuePool]:
+    """创建记录连接获取耗时的连接池类（重建连接池时沿用同一个类）"""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return base.connect(self)
+        except PoolTimeoutError:
+            metrics.timeouts += 1
+            raise
+        finally:
+            metrics.record_checkout(time.perf_counter() - start)
+
+    return type(f"Timed{base.__name__}", (base,), {"connect": connect})
+
+
+def get_engine_options(url: str, name: str, pool_class: Type[QueuePool]) -> Dict[str, Any]:
+    """
+    获取引擎连接池参数
+
+    SQLite使用SQLAlchemy默认连接池；其他数据库使用可配置的计时连接池。
+
+    Args:
+        url: 数据库URL
+        name: 引擎名称，用于区分指标
+        pool_class: 连接池基类
+
+    Returns:
+        create_engine参数
+    """
+    metrics = pool_metrics[name] = PoolMetrics(name)
+    if url.startswith("sqlite"):
+        return {}
+
+    return {
+        "poolclass": _timed_pool_class(pool_class, metrics),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """获取所有引擎的连接池指标（只读副本额外包含健康状态）"""
+    stats = {name: metrics.stats() for name, metrics in pool_metrics.items()}
+    for name, healthy in zip(replica_set.names, replica_set.healthy):
+        stats[name]["healthy"] = int(healthy)
+    return stats
+
 
 # 创建数据库引擎
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
     echo=settings.DEBUG,  # 在调试模式下显示SQL语句
+    **get_engine_options(settings.DATABASE_URL, "primary_sync", QueuePool),
 )
+pool_metrics["primary_sync"].listen(engine)
+instrument_engine(engine)
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步驱动映射
+ASYNC_DRIVERS = {
+    "sqlite://": "sqlite+aiosqlite://",
+    "postgresql://": "postgresql+asyncpg://",
+    "mysql://": "mysql+aiomysql://",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """
+    将同步数据库URL转换为对应异步驱动的URL
+
+    Args:
+        url: 同步数据库URL
+
+    Returns:
+        异步数据库URL
+    """
+    for prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix) :]
+    return url
+
+
+# 创建异步数据库引擎
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    echo=settings.DEBUG,
+    **get_engine_options(settings.DATABASE_URL, "primary", AsyncAdaptedQueuePool),
+)
+pool_metrics["primary"].listen(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine)
+
+# 创建异步会话工厂（提交后不过期对象，便于在提交后直接返回ORM对象）
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# 会话info中表示改由主库读取的标记
+USE_PRIMARY = "use_primary"
+
+
+class ReadSession(Session):
+    """
+    只读会话使用的同步会话类
+
+    默认使用创建会话时绑定的引擎（只读副本），会话info中设置了 USE_PRIMARY
+    标记后，之后的查询改由主库执行。引擎在每次执行时通过 get_bind 选择，
+    会话已在副本上开始事务时同样生效。
+    """
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Engine:
+        if self.info.get(USE_PRIMARY):
+            return async_engine.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+# 创建只读异步会话工厂（创建时绑定到选出的副本）
+ReadSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False, sync_session_class=ReadSession
+)
+
+
+class ReplicaSet:
+    """
+    只读副本引擎集合
+
+    按策略（轮询或最少连接）在健康的副本之间选择。连接失败或连接断开的副本
+    被标记为不健康，不再参与选择，由后台任务定期检查，恢复后重新启用；
+    没有健康副本时读取回退到主库。
+    """
+
+    def __init__(self, urls: List[str], strategy: str):
+        """
+        Args:
+            urls: 只读副本数据库URL
+            strategy: round_robin（轮询）或 least_connections（最少连接）
+        """
+        self.strategy = strategy
+        self.engines: List[AsyncEngine] = []
+        self.names: List[str] = []
+        self.healthy: List[bool] = []
+        self._counter = itertools.count()
+        self._checker: Optional[asyncio.Task] = None
+
+        for index, url in enumerate(urls):
+            name = f"replica{index}"
+            replica = create_async_engine(
+                get_async_database_url(url),
+                echo=settings.DEBUG,
+                **get_engine_options(url, name, AsyncAdaptedQueuePool),
+            )
+            pool_metrics[name].listen(replica.sync_engine)
+            instrument_engine(replica.sync_engine)
+            self._listen_errors(replica, len(self.engines))
+            self.engines.append(replica)
+            self.names.append(name)
+            self.healthy.append(True)
+
+    def _listen_errors(self, replica: AsyncEngine, index: int) -> None:
+        """连接失败或连接断开时将副本标记为不健康"""
+
+        @event.listens_for(replica.sync_engine, "handle_error")
+        def on_error(context: ExceptionContext) -> None:
+            if context.connection is None or context.is_disconnect:
+                self.mark_unhealthy(index, context.original_exception)
+
+    def mark_unhealthy(self, index: int, error: Any) -> None:
+        """将副本标记为不健康"""
+        if self.healthy[index]:
+            self.healthy[index] = False
+            logger.warning("只读副本不可用，读取暂时改由其他副本或主库处理", replica=self.names[index], error=str(error))
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """
+        选择一个健康的副本
+
+        Returns:
+            副本引擎，没有健康副本时返回None
+        """
+        candidates = [index for index, healthy in enumerate(self.healthy) if healthy]
+        if not candidates:
+            return None
+        if self.strategy == "least_connections":
+            index = min(candidates, key=lambda i: pool_metrics[self.names[i]].in_use)
+        else:
+            index = candidates[next(self._counter) % len(candidates)]
+        return self.engines[index]
+
+    async def check(self) -> None:
+        """检查所有副本的可用性"""
+        for index, replica in enumerate(self.engines):
+            try:
+                async with replica.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except Exception as e:
+                self.mark_unhealthy(index, e)
+            else:
+                if not self.healthy[index]:
+                    self.healthy[index] = True
+                    logger.info("只读副本已恢复", replica=self.names[index])
+
+    async def _check_loop(self) -> None:
+        """定期检查副本可用性"""
+        while True:
+            await asyncio.sleep(settings.DB_REPLICA_HEALTH_INTERVAL)
+            await self.check()
+
+    async def start(self) -> None:
+        """启动后台健康检查"""
+        if self.engines and self._checker is None:
+            self._checker = asyncio.create_task(self._check_loop())
+
+    async def stop(self) -> None:
+        """停止健康检查并关闭副本连接池"""
+        if self._checker is not None:
+            self._checker.cancel()
+            try:
+                await self._checker
+            except asyncio.CancelledError:
+                pass
+            self._checker = None
+        for replica in self.engines:
+            await replica.dispose()
+
+
+# 只读副本
+replica_set = ReplicaSet(settings.DATABASE_REPLICA_URLS, settings.DB_REPLICA_STRATEGY)
+
+# 最近写入的记录（读己之写）：粘滞期内对这些记录的读取使用主库。
+# 使用Redis缓存后端时各工作进程共享，否则只在写入的进程内生效
+WRITTEN_KEY_PREFIX = "written:"
+recent_writes = create_cache_backend(
+    "redis" if settings.CACHE_BACKEND == "redis" else "memory", 100000, settings.DB_REPLICA_STICKY_SECONDS
+)
+
+
+async def mark_written(*keys: str) -> None:
+    """
+    记录写入的记录，粘滞期内对这些记录的读取使用主库
+
+    Args:
+        keys: 记录标识（如 user:1、username:alice）
+    """
+    if not replica_set.engines:
+        return
+    for key in keys:
+        await recent_writes.set(WRITTEN_KEY_PREFIX + key, b"1", settings.DB_REPLICA_STICKY_SECONDS)
+
+
+async def use_primary_if_written(db: AsyncSession, *keys: str) -> None:
+    """
+    被读取的记录在粘滞期内写入过时，该只读会话之后的查询改由主库执行
+
+    Args:
+        db: 只读会话（由 get_read_db 创建）
+        keys: 即将读取的记录标识
+    """
+    if db.bind is async_engine or db.info.get(USE_PRIMARY):
+        return
+    for key in keys:
+        if await recent_writes.get(WRITTEN_KEY_PREFIX + key) is not None:
+            db.info[USE_PRIMARY] = True
+            return
+
+
 # 创建基础模型类
 Base = declarative_base()
 
@@ -32,6 +378,9 @@ def get_db() -> Generator[Session, None, None]:
         Session: 数据库会话对象
     """
     db = SessionLocal()
+    DB_SESSIONS.labels("sync").inc()
+    active = DB_SESSIONS_ACTIVE.labels("sync")
+    active.inc()
     try:
         logger.debug("数据库会话已创建")
         yield db
@@ -41,9 +390,74 @@ def get_db() -> Generator[Session, None, None]:
         raise
     finally:
         db.close()
+        active.dec()
         logger.debug("数据库会话已关闭")
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    获取异步数据库会话的依赖注入函数
+
+    Yields:
+        AsyncSession: 异步数据库会话对象
+    """
+    DB_SESSIONS.labels("async").inc()
+    active = DB_SESSIONS_ACTIVE.labels("async")
+    active.inc()
+    async with AsyncSessionLocal() as db:
+        try:
+            logger.debug("异步数据库会话已创建")
+            yield db
+        except Exception as e:
+            logger.error("异步数据库会话异常", error=str(e))
+            await db.rollback()
+            raise
+        finally:
+            active.dec()
+            logger.debug("异步数据库会话已关闭")
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    获取只读异步数据库会话的依赖注入函数
+
+    配置了只读副本时，会话绑定到按策略选出的健康副本，没有可用副本时使用主库。
+    副本数据可能存在复制延迟，需要读己之写的查询应先调用 use_primary_if_written。
+
+    Yields:
+        AsyncSession: 异步数据库会话对象
+    """
+    replica = replica_set.choose()
+    DB_SESSIONS.labels("read").inc()
+    active = DB_SESSIONS_ACTIVE.labels("read")
+    active.inc()
+    async with ReadSessionLocal(bind=replica or async_engine) as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error("只读数据库会话异常", error=str(e))
+            await db.rollback()
+            raise
+        finally:
+            active.dec()
+
+
+async def warmup_engines() -> None:
+    """
+    预先建立数据库连接
+
+    首次连接时SQLAlchemy会初始化方言（查询服务端版本等），在启动阶段完成，
+    首个请求不再承担建立连接和初始化的耗时。连接失败时只记录警告，不阻止启动。
+    """
+    try:
+        async with async_engine.connect():
+            pass
+    except Exception as e:
+        logger.warning("数据库连接预热失败", error=str(e))
+    # 副本不可用时会被标记为不健康，读取回退到主库
+    await replica_set.check()
+
+
 def create_tables() -> None:
     """创建数据库表"""
     try:
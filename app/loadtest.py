@@ -0,0 +1,534 @@
+"""
+闭环负载生成工具
+
+对运行中的服务按加权的混合负载发送请求，用于评估实际流量下的容量。
+每个虚拟用户持有自己的令牌，收到响应后立即（或等待思考时间后）发送
+下一个请求（闭环模型）。并发数按阶梯逐步增加，每一阶测量吞吐量和延迟
+分布，并给出吞吐量/延迟曲线的拐点：继续增加并发后吞吐量的增长明显
+小于并发的增长，多出的并发只会排队、拉高延迟。
+
+每个账号只登录一次，虚拟用户轮流使用各账号的会话，同一账号的虚拟用户
+共享令牌；访问令牌即将过期或返回401时由其中一个虚拟用户使用刷新令牌
+换取新令牌。默认注册 --accounts 个压测账号（已存在时直接复用），也可以用
+--username/--password 指定已有账号。被限流（返回429）的请求记为失败，
+该虚拟用户退避后继续；负载中包含登录时，需要相应调高服务端的
+LOGIN_IP_LIMIT，否则登录会被限流。
+
+用法:
+    python -m app.loadtest --url http://localhost:8000
+    python -m app.loadtest --steps 10,20,40,80 --step-duration 30
+    python -m app.loadtest --profile get_user=70,me=20,login=5,update_profile=5 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+# 默认负载：70%单用户查询、20%当前用户、5%登录、5%写操作
+DEFAULT_PROFILE = "get_user=70,me=20,login=5,update_profile=5"
+
+# 访问令牌剩余有效期低于该比例时提前刷新
+REFRESH_MARGIN = 0.1
+
+# 被限流后的退避时间（秒），连续被限流时加倍，不超过上限
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+# 注册压测账号时表示账号已存在的提示
+EXISTING_ACCOUNT_MESSAGES = ("用户名已存在", "邮箱已存在")
+
+# 准备阶段登录被限流时的最大尝试次数
+LOGIN_ATTEMPTS = 5
+
+
+def retry_after(response: httpx.Response, default: float) -> float:
+    """读取429响应的Retry-After（秒），缺失或无效时返回默认值"""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return default
+
+
+def error_message(response: httpx.Response) -> str:
+    """读取错误响应的提示信息（自定义异常为error.message，其余为detail）"""
+    try:
+        data = response.json()
+    except ValueError:
+        return ""
+    if not isinstance(data, dict):
+        return ""
+    if isinstance(data.get("error"), dict):
+        return str(data["error"].get("message", ""))
+    return str(data.get("detail", ""))
+
+
+class AccountSession:
+    """
+    账号会话，负责登录和令牌刷新
+
+    同一账号的所有虚拟用户共享一个会话：令牌过期时只由一个虚拟用户刷新，
+    其余虚拟用户等待后直接使用新令牌。
+    """
+
+    def __init__(self, client: httpx.AsyncClient, prefix: str, username: str, password: str):
+        """
+        Args:
+            client: httpx客户端
+            prefix: API路径前缀
+            username: 用户名
+            password: 密码
+        """
+        self.client = client
+        self.prefix = prefix
+        self.username = username
+        self.password = password
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.refresh_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _store_tokens(self, response: httpx.Response) -> None:
+        """保存令牌并计算提前刷新的时间"""
+        data = response.json()
+        self.access_token = data["access_token"]
+        self.refresh_token = data["refresh_token"]
+        self.refresh_at = time.monotonic() + data["expires_in"] * (1 - REFRESH_MARGIN)
+
+    async def login(self) -> httpx.Response:
+        """登录并保存令牌"""
+        response = await self.client.post(
+            f"{self.prefix}/auth/login", data={"username": self.username, "password": self.password}
+        )
+        if response.status_code == 200:
+            self._store_tokens(response)
+        return response
+
+    async def refresh(self, stale_token: Optional[str] = None) -> Optional[httpx.Response]:
+        """
+        使用刷新令牌换取新令牌，失败时重新登录
+
+        Args:
+            stale_token: 调用方使用的过期令牌；其他虚拟用户已换取新令牌时直接返回
+
+        Returns:
+            成功时返回None，失败时返回最后一次请求的响应（如登录被限流的429）
+        """
+        async with self._lock:
+            if (
+                self.access_token is not None
+                and self.access_token != stale_token
+                and time.monotonic() < self.refresh_at
+            ):
+                return None
+            if self.refresh_token is not None:
+                response = await self.client.post(
+                    f"{self.prefix}/auth/refresh", json={"refresh_token": self.refresh_token}
+                )
+                if response.status_code == 200:
+                    self._store_tokens(response)
+                    return None
+                # 刷新令牌已失效，只能重新登录
+                self.refresh_token = None
+            response = await self.login()
+            return None if response.status_code == 200 else response
+
+    async def request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """
+        发送需要认证的请求
+
+        令牌即将过期时先刷新；返回401时刷新令牌后重试一次。刷新失败时
+        返回刷新失败的响应，由调用方计入失败请求。
+
+        Args:
+            method: HTTP方法
+            path: API前缀之后的路径
+            **kwargs: 传给httpx的其他参数
+
+        Returns:
+            响应
+        """
+        if self.access_token is None or time.monotonic() >= self.refresh_at:
+            failed = await self.refresh(self.access_token)
+            if failed is not None:
+                return failed
+        url = f"{self.prefix}{path}"
+        token = self.access_token
+        response = await self.client.request(method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        if response.status_code == 401:
+            failed = await self.refresh(token)
+            if failed is not None:
+                return failed
+            response = await self.client.request(
+                method, url, headers={"Authorization": f"Bearer {self.access_token}"}, **kwargs
+            )
+        return response
+
+
+# 负载操作：接收账号会话和用户ID列表，返回响应状态码
+Operation = Callable[[AccountSession, List[int]], Awaitable[int]]
+
+
+async def op_get_user(session: AccountSession, user_ids: List[int]) -> int:
+    return (await session.request("GET", f"/users/{random.choice(user_ids)}")).status_code
+
+
+async def op_me(session: AccountSession, user_ids: List[int]) -> int:
+    return (await session.request("GET", "/auth/me")).status_code
+
+
+async def op_list_users(session: AccountSession, user_ids: List[int]) -> int:
+    return (await session.request("GET", "/users/", params={"cursor": ""})).status_code
+
+
+async def op_login(session: AccountSession, user_ids: List[int]) -> int:
+    return (await session.login()).status_code
+
+
+async def op_update_profile(session: AccountSession, user_ids: List[int]) -> int:
+    bio = f"负载测试 {random.randrange(1_000_000)}"
+    return (await session.request("PUT", "/users/me/profile", json={"bio": bio})).status_code
+
+
+OPERATIONS: Dict[str, Operation] = {
+    "get_user": op_get_user,
+    "me": op_me,
+    "list_users": op_list_users,
+    "login": op_login,
+    "update_profile": op_update_profile,
+}
+
+
+def parse_profile(value: str) -> Dict[str, int]:
+    """
+    解析负载配置
+
+    Args:
+        value: 形如"get_user=70,me=20,login=5,update_profile=5"的权重配置
+
+    Returns:
+        操作名称 -> 权重
+
+    Raises:
+        ValueError: 配置格式无效或包含未知操作
+    """
+    profile = {}
+    for item in value.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"未知的负载操作: {name}，可选: {', '.join(OPERATIONS)}")
+        if not weight.isdigit():
+            raise ValueError(f"无效的权重: {item}")
+        profile[name] = int(weight)
+    if not any(profile.values()):
+        raise ValueError("负载配置的权重之和必须大于0")
+    return profile
+
+
+def parse_steps(value: str) -> List[int]:
+    """
+    解析并发阶梯
+
+    Args:
+        value: 逗号分隔的递增并发数，如"10,20,40"
+
+    Returns:
+        并发数列表
+
+    Raises:
+        ValueError: 格式无效或并发数不递增
+    """
+    steps = [int(item) for item in value.split(",")]
+    if not steps or steps[0] < 1 or any(b <= a for a, b in zip(steps, steps[1:])):
+        raise ValueError("并发阶梯必须是递增的正整数")
+    return steps
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """计算已排序数据的百分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(1, math.ceil(percent / 100 * len(sorted_values))) - 1]
+
+
+def summarize(latencies: List[float], statuses: Counter, duration: float) -> Dict[str, Any]:
+    """
+    汇总一组请求的吞吐量、延迟和错误
+
+    Args:
+        latencies: 请求耗时（秒）
+        statuses: 状态码计数，0表示连接错误
+        duration: 测量时长（秒）
+
+    Returns:
+        统计结果
+    """
+    latencies = sorted(latencies)
+    total = len(latencies)
+    errors = sum(count for status, count in statuses.items() if status == 0 or status >= 400)
+    return {
+        "requests": total,
+        "throughput_rps": total / duration,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "error_rate": errors / total if total else 0.0,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+async def run_step(
+    vus: List[AccountSession], profile: Dict[str, int], user_ids: List[int], duration: float, think_time: float
+) -> Dict[str, Any]:
+    """
+    以给定虚拟用户数运行一阶负载
+
+    被限流（429）的请求计为失败，该虚拟用户退避后继续。
+
+    Args:
+        vus: 各虚拟用户使用的账号会话（可重复）
+        profile: 操作权重
+        user_ids: 可查询的用户ID
+        duration: 持续时间（秒）
+        think_time: 每个虚拟用户两次请求之间的等待时间（秒）
+
+    Returns:
+        本阶总体和各操作的统计结果
+    """
+    names = list(profile)
+    weights = [profile[name] for name in names]
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    statuses: Dict[str, Counter] = {name: Counter() for name in names}
+    deadline = time.monotonic() + duration
+
+    async def loop(session: AccountSession) -> None:
+        backoff = 0.0
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = await OPERATIONS[name](session, user_ids)
+            except httpx.HTTPError:
+                status = 0
+            latencies[name].append(time.perf_counter() - start)
+            statuses[name][status] += 1
+            if status == 429:
+                backoff = min(backoff * 2 or BACKOFF_BASE, BACKOFF_MAX)
+                await asyncio.sleep(max(min(backoff, deadline - time.monotonic()), 0))
+                continue
+            backoff = 0.0
+            if think_time:
+                await asyncio.sleep(think_time)
+
+    started = time.monotonic()
+    await asyncio.gather(*(loop(vu) for vu in vus))
+    elapsed = time.monotonic() - started
+
+    result = summarize(
+        [value for values in latencies.values() for value in values], sum(statuses.values(), Counter()), elapsed
+    )
+    result["concurrency"] = len(vus)
+    result["operations"] = {
+        name: summarize(latencies[name], statuses[name], elapsed) for name in names if latencies[name]
+    }
+    return result
+
+
+def find_knee(steps: List[Dict[str, Any]], efficiency: float, max_error_rate: float) -> Optional[int]:
+    """
+    查找吞吐量/延迟曲线的拐点
+
+    相邻两阶的扩展效率 = 吞吐量增长比例 / 并发增长比例。拐点为扩展效率
+    首次低于阈值（或错误率超过上限）之前的一阶。
+
+    Args:
+        steps: 各阶统计结果
+        efficiency: 扩展效率阈值
+        max_error_rate: 错误率上限
+
+    Returns:
+        拐点所在阶的下标；所有阶都未出现拐点时返回None
+    """
+    for previous, step in zip(steps, steps[1:]):
+        if previous["throughput_rps"] > 0:
+            gain = step["throughput_rps"] / previous["throughput_rps"] - 1
+            growth = step["concurrency"] / previous["concurrency"] - 1
+            step["scaling_efficiency"] = gain / growth
+
+    for index, step in enumerate(steps):
+        if step["error_rate"] > max_error_rate:
+            return max(index - 1, 0)
+        if step.get("scaling_efficiency", efficiency) < efficiency:
+            return index - 1
+    return None
+
+
+async def prepare_accounts(client: httpx.AsyncClient, prefix: str, args: argparse.Namespace) -> List[Dict[str, str]]:
+    """
+    准备虚拟用户使用的账号，未指定账号时注册压测账号（用户名已存在时直接复用）
+
+    Returns:
+        账号列表
+
+    Raises:
+        httpx.HTTPStatusError: 注册失败
+    """
+    if args.username:
+        return [{"username": args.username, "password": args.password}]
+
+    accounts = []
+    for i in range(args.accounts):
+        account = {"username": f"{args.account_prefix}{i}", "password": args.password}
+        response = await client.post(
+            f"{prefix}/auth/register",
+            json={**account, "email": f"{args.account_prefix}{i}@example.com", "full_name": f"压测用户{i}"},
+        )
+        # 账号已存在时数据库先检查哪个唯一约束不确定，两种提示都按已存在处理；
+        # 邮箱被其他账号占用时在随后的登录中报错
+        if response.status_code != 200 and error_message(response) not in EXISTING_ACCOUNT_MESSAGES:
+            response.raise_for_status()
+        accounts.append(account)
+    return accounts
+
+
+async def login_accounts(
+    client: httpx.AsyncClient, prefix: str, accounts: List[Dict[str, str]]
+) -> List[AccountSession]:
+    """
+    每个账号登录一次，登录被限流时按Retry-After等待后重试
+
+    Returns:
+        账号会话列表
+
+    Raises:
+        httpx.HTTPStatusError: 登录失败
+    """
+    sessions = []
+    for account in accounts:
+        session = AccountSession(client, prefix, account["username"], account["password"])
+        for attempt in range(LOGIN_ATTEMPTS):
+            response = await session.login()
+            if response.status_code != 429 or attempt == LOGIN_ATTEMPTS - 1:
+                break
+            delay = retry_after(response, BACKOFF_BASE * 2**attempt)
+            print(f"⏳ {account['username']} 登录被限流，{delay:.0f} 秒后重试")
+            await asyncio.sleep(delay)
+        response.raise_for_status()
+        sessions.append(session)
+    return sessions
+
+
+async def fetch_user_ids(session: AccountSession, limit: int) -> List[int]:
+    """按游标分页获取最多limit个用户ID，供单用户查询使用"""
+    user_ids: List[int] = []
+    cursor = ""
+    while cursor is not None and len(user_ids) < limit:
+        response = await session.request("GET", "/users/", params={"cursor": cursor, "limit": 100})
+        response.raise_for_status()
+        page = response.json()
+        user_ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+    return user_ids[:limit]
+
+
+async def run(args: argparse.Namespace, profile: Dict[str, int], steps: List[int]) -> Dict[str, Any]:
+    """
+    按并发阶梯运行负载
+
+    Returns:
+        各阶统计结果和拐点
+    """
+    prefix = args.api_prefix
+    limits = httpx.Limits(max_connections=steps[-1], max_keepalive_connections=steps[-1])
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        accounts = await prepare_accounts(client, prefix, args)
+        # 每个账号在压测开始前登录一次，登录耗时不计入各阶
+        sessions = await login_accounts(client, prefix, accounts)
+        user_ids = await fetch_user_ids(sessions[0], args.max_user_ids)
+        results = []
+        for concurrency in steps:
+            # 虚拟用户轮流使用各账号的会话
+            vus = [sessions[i % len(sessions)] for i in range(concurrency)]
+            print(f"⏱️  并发 {concurrency}: 持续 {args.step_duration:.0f} 秒")
+            result = await run_step(vus, profile, user_ids, args.step_duration, args.think_time)
+            results.append(result)
+            print(
+                f"   {result['throughput_rps']:8.1f} 请求/秒  p50 {result['p50_ms']:7.1f} ms  "
+                f"p95 {result['p95_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms  "
+                f"错误率 {result['error_rate'] * 100:5.2f}%"
+            )
+
+    knee = find_knee(results, args.knee_efficiency, args.max_error_rate)
+    return {"url": args.url, "profile": profile, "steps": results, "knee": knee}
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """打印各阶结果和拐点"""
+    steps = report["steps"]
+    print(f"\n{'并发':>6}{'请求/秒':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'错误率':>9}{'扩展效率':>10}")
+    for index, step in enumerate(steps):
+        efficiency = step.get("scaling_efficiency")
+        print(
+            f"{step['concurrency']:>6}{step['throughput_rps']:>10.1f}{step['p50_ms']:>9.1f}{step['p95_ms']:>9.1f}"
+            f"{step['p99_ms']:>9.1f}{step['error_rate'] * 100:>8.2f}%"
+            f"{'' if efficiency is None else f'{efficiency:.2f}':>10}{'  <- 拐点' if index == report['knee'] else ''}"
+        )
+
+    knee = report["knee"]
+    if knee is None:
+        print("\n⚠️  所有阶梯均未出现拐点，请继续提高并发")
+        return
+
+    step = steps[knee]
+    print(f"\n📈 拐点: 并发 {step['concurrency']}，{step['throughput_rps']:.1f} 请求/秒，p95 {step['p95_ms']:.1f} ms")
+    for name, op in step["operations"].items():
+        print(
+            f"   {name:<16}{op['requests']:>8} 次  p50 {op['p50_ms']:7.1f} ms  p95 {op['p95_ms']:7.1f} ms  "
+            f"状态码 {op['statuses']}"
+        )
+    if any("429" in step["operations"][name]["statuses"] for name in step["operations"]):
+        print("⚠️  部分请求被限流（429），可调高服务端的 LOGIN_IP_LIMIT 后重试")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="闭环负载生成工具")
+    parser.add_argument("--url", default="http://localhost:8000", help="服务地址")
+    parser.add_argument("--api-prefix", default="/api/v1", help="API路径前缀")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help=f"操作权重，可选操作: {', '.join(OPERATIONS)}")
+    parser.add_argument("--steps", default="10,20,40,80,160", help="逗号分隔的并发阶梯")
+    parser.add_argument("--step-duration", type=float, default=30.0, help="每阶持续时间（秒）")
+    parser.add_argument("--think-time", type=float, default=0.0, help="虚拟用户两次请求之间的等待时间（秒）")
+    parser.add_argument("--timeout", type=float, default=30.0, help="请求超时时间（秒）")
+    parser.add_argument("--username", help="使用已有账号，不注册压测账号")
+    parser.add_argument("--password", default="loadtest-password", help="账号密码")
+    parser.add_argument("--accounts", type=int, default=10, help="注册的压测账号数")
+    parser.add_argument("--account-prefix", default="loadtest", help="压测账号用户名前缀")
+    parser.add_argument("--max-user-ids", type=int, default=1000, help="单用户查询使用的用户ID数")
+    parser.add_argument("--knee-efficiency", type=float, default=0.5, help="判定拐点的扩展效率阈值")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="判定拐点的错误率上限")
+    parser.add_argument("--output", help="结果JSON文件")
+    args = parser.parse_args()
+
+    try:
+        profile = parse_profile(args.profile)
+        steps = parse_steps(args.steps)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+
+    report = asyncio.run(run(args, profile, steps))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
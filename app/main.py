@@ -1,22 +1,39 @@
 """
 FastAPI 应用主入口
+
+应用在导入时由 create_app() 一次性构建完成（中间件、路由、异常处理器），
+生命周期中只启动和释放运行时资源。gunicorn预加载应用时，构建工作只在主进程
+中执行一次，各工作进程直接共享。
 """
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import APIRouter, Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 
 from app.core.config import settings
-from app.core.logging import setup_logging
+from app.core.logging import get_logger, setup_logging, shutdown_logging
+from app.core.startup import get_startup_phases, startup_phase
 from app.api.v1.api import api_router
 from app.core.exceptions import setup_exception_handlers
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.responses import ORJSONResponse
+from app.core.timing import ServerTimingMiddleware
+from app.core.security import password_hash_pool, preload_backends
+from app.core.cache import close_redis_client
+from app.core.deps import require_metrics_access
+from app.core.revocation import revocation_store
+from app.core.last_login import last_login_buffer
+from app.database.database import async_engine, get_pool_stats, replica_set, warmup_engines
 
 # 设置日志
 setup_logging()
 
+logger = get_logger(__name__)
+
 
 # 配置中间件
-def setup_middleware():
+def setup_middleware(app: FastAPI) -> None:
     """配置应用中间件"""
     # CORS中间件
     app.add_middleware(
@@ -33,46 +50,58 @@ def setup_middleware():
         allowed_hosts=settings.ALLOWED_HOSTS,
     )
 
+    # Server-Timing中间件
+    app.add_middleware(ServerTimingMiddleware)
+
+    # 请求指标中间件（最后添加，位于最外层，统计完整的请求耗时）
+    app.add_middleware(MetricsMiddleware)
+
 
 # 设置路由
-def setup_routes():
+def setup_routes(app: FastAPI) -> None:
     """设置API路由"""
+    app.include_router(system_router)
     app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
 # Lifespan事件处理器
-from contextlib import asynccontextmanager
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时执行
-    setup_middleware()
-    setup_routes()
-    setup_exception_handlers(app)
+    with startup_phase("revocation_store"):
+        await revocation_store.start()
+    with startup_phase("last_login_buffer"):
+        await last_login_buffer.start()
+    with startup_phase("replica_health_check"):
+        await replica_set.start()
+    if settings.PRELOAD_BACKENDS:
+        # 连接需要在fork之后建立，放在各工作进程的启动阶段
+        with startup_phase("warmup_engines"):
+            await warmup_engines()
+    logger.info("应用启动阶段耗时", phases_ms={name: round(s * 1000, 1) for name, s in get_startup_phases().items()})
     print(f"🚀 {settings.PROJECT_NAME} 启动成功!")
 
     yield
 
     # 关闭时执行
+    await revocation_store.stop()
+    # 写入缓冲中剩余的最后登录时间，需在关闭数据库连接池之前
+    await last_login_buffer.stop()
+    await replica_set.stop()
+    password_hash_pool.shutdown()
+    await close_redis_client()
+    await async_engine.dispose()
     print(f"👋 {settings.PROJECT_NAME} 正在关闭...")
+    shutdown_logging()
 
 
-# 创建FastAPI应用实例
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    description=settings.PROJECT_DESCRIPTION,
-    version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    docs_url="/docs",
-    redoc_url="/redoc",
-    lifespan=lifespan,
-)
+# 系统端点（健康检查、指标等，不带API前缀）
+system_router = APIRouter()
 
 
 # 健康检查端点
-@app.get("/health")
+@system_router.get("/health")
 async def health_check():
     """健康检查接口"""
     return {
@@ -82,8 +111,23 @@ async def health_check():
     }
 
 
+# Prometheus指标端点（仅可信网段或携带抓取令牌的请求可访问）
+@system_router.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+async def metrics():
+    """Prometheus指标接口"""
+    content, content_type = render_metrics()
+    return Response(content=content, headers={"Content-Type": content_type})
+
+
+# 数据库连接池指标（内部端点，访问控制与指标端点相同）
+@system_router.get("/internal/db-pool", include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+async def db_pool_stats():
+    """数据库连接池指标接口"""
+    return get_pool_stats()
+
+
 # 根路径
-@app.get("/")
+@system_router.get("/")
 async def root():
     """根路径接口"""
     return {
@@ -92,3 +136,39 @@ async def root():
         "docs": "/docs",
         "redoc": "/redoc",
     }
+
+
+def create_app() -> FastAPI:
+    """
+    创建并配置FastAPI应用
+
+    PRELOAD_BACKENDS开启时同时预加载密码哈希和JWT后端，首个登录请求不再承担
+    加载耗时。OpenAPI文档仍在首次访问时生成，不计入启动耗时。
+
+    Returns:
+        FastAPI应用实例
+    """
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        description=settings.PROJECT_DESCRIPTION,
+        version=settings.VERSION,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
+    )
+    with startup_phase("middleware"):
+        setup_middleware(app)
+    with startup_phase("routes"):
+        setup_routes(app)
+    with startup_phase("exception_handlers"):
+        setup_exception_handlers(app)
+    if settings.PRELOAD_BACKENDS:
+        with startup_phase("preload_backends"):
+            preload_backends()
+    return app
+
+
+# 创建FastAPI应用实例
+app = create_app()
@@ -1,7 +1,7 @@
 """
 用户数据模型
 """
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
 
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
@@ -10,6 +10,11 @@ from sqlalchemy.sql import func
 from app.database.database import Base
 
 
+def _utcnow() -> datetime:
+    """当前UTC时间（微秒精度，数据库的now()在SQLite上只精确到秒）"""
+    return datetime.now(timezone.utc)
+
+
 class User(Base):
     """用户模型"""
     
@@ -36,7 +41,10 @@ class User(Base):
     
     # 时间戳
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+    # 更新时间用作ETag版本，由应用生成微秒精度的时间，同一秒内的多次更新也能区分
+    updated_at = Column(
+        DateTime(timezone=True), default=_utcnow, server_default=func.now(), onupdate=_utcnow, comment="更新时间"
+    )
     last_login = Column(DateTime(timezone=True), nullable=True, comment="最后登录时间")
     
     def __repr__(self) -> str:
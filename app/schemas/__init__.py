@@ -6,6 +6,9 @@ from .user import (
     UserCreate,
     UserUpdate,
     UserResponse,
+    UserPage,
+    BulkImportRow,
+    BulkImportResult,
     UserInDB,
     UserLogin,
     Token,
@@ -18,6 +21,9 @@ __all__ = [
     "UserCreate",
     "UserUpdate",
     "UserResponse",
+    "UserPage",
+    "BulkImportRow",
+    "BulkImportResult",
     "UserInDB",
     "UserLogin",
     "Token",
@@ -3,7 +3,7 @@
 """
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, EmailStr, validator
 
@@ -105,6 +105,31 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class UserPage(BaseModel):
+    """用户分页响应模式（游标分页）"""
+
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+
+
+class BulkImportRow(BaseModel):
+    """批量导入单行结果模式"""
+
+    line: int
+    username: Optional[str] = None
+    status: str  # created 或 error
+    error: Optional[str] = None
+
+
+class BulkImportResult(BaseModel):
+    """批量导入结果模式"""
+
+    total: int
+    created: int
+    failed: int
+    results: List[BulkImportRow]
+
+
 class UserLogin(BaseModel):
     """用户登录模式"""
 
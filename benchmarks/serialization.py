@@ -0,0 +1,82 @@
+"""
+用户列表序列化基准测试
+
+对比 get_users 一页数据在三种响应路径下的单次序列化耗时：
+
+- stdlib: response_model校验 + 标准库json（改造前的默认路径）
+- orjson: response_model校验 + ORJSONResponse（默认响应类）
+- fast: 只取响应字段的行数据直接交给ORJSONResponse（get_users当前路径）
+
+用法:
+    python -m benchmarks.serialization [--rows 100] [--number 2000]
+"""
+import argparse
+import timeit
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.core.responses import USER_RESPONSE_FIELDS, ORJSONResponse
+from app.models.user import User
+from app.schemas.user import UserResponse
+
+
+def build_users(rows: int) -> List[User]:
+    """构造一页用户对象"""
+    now = datetime.utcnow()
+    return [
+        User(
+            id=i,
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            full_name=f"测试用户{i}",
+            avatar=None,
+            bio="这是一段用户简介" * 4,
+            is_active=True,
+            is_superuser=False,
+            created_at=now - timedelta(days=i),
+            updated_at=now,
+            last_login=now,
+        )
+        for i in range(1, rows + 1)
+    ]
+
+
+def build_cases(rows: int) -> Dict[str, Callable[[], Any]]:
+    """构造各响应路径的序列化函数"""
+    users = build_users(rows)
+    row_dicts = [{field: getattr(user, field) for field in USER_RESPONSE_FIELDS} for user in users]
+    adapter = TypeAdapter(List[UserResponse])
+
+    def validated() -> Any:
+        # 与FastAPI处理response_model的方式一致：先校验，再转换为JSON兼容对象
+        return adapter.dump_python(adapter.validate_python(users, from_attributes=True), mode="json")
+
+    return {
+        "stdlib": lambda: JSONResponse(validated()).body,
+        "orjson": lambda: ORJSONResponse(validated()).body,
+        "fast": lambda: ORJSONResponse(row_dicts).body,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="用户列表序列化基准测试")
+    parser.add_argument("--rows", type=int, default=100, help="每页用户数")
+    parser.add_argument("--number", type=int, default=2000, help="每轮执行次数")
+    parser.add_argument("--repeat", type=int, default=5, help="轮数（取最快一轮）")
+    args = parser.parse_args()
+
+    cases = build_cases(args.rows)
+    baseline = None
+    print(f"rows={args.rows} number={args.number} repeat={args.repeat}")
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=args.number, repeat=args.repeat)) / args.number
+        baseline = baseline or best
+        saved = baseline - best
+        print(f"{name:>8}: {best * 1e6:9.1f} µs/请求  节省 {saved * 1e6:9.1f} µs ({saved / baseline * 100:5.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,22 @@
 #!/usr/bin/env python3
 """
 FastAPI 项目启动脚本
+
+用法:
+    python start.py          # 开发模式：单进程，代码变更后自动重载
+    python start.py --prod   # 生产模式：gunicorn管理多个uvicorn工作进程
+    python start.py --profile-startup  # 分析导入和启动各阶段耗时
 """
+import argparse
+import glob
+import importlib.util
 import os
 import sys
 import subprocess
+import tempfile
 from pathlib import Path
 
+
 def check_python_version():
     """检查Python版本"""
     if sys.version_info < (3, 8):
@@ -14,6 +24,7 @@ def check_python_version():
         sys.exit(1)
     print(f"✅ Python 版本: {sys.version}")
 
+
 def check_dependencies():
     """检查依赖是否安装"""
     try:
@@ -21,12 +32,14 @@ def check_dependencies():
         import uvicorn
         import sqlalchemy
         import pydantic
+
         print("✅ 核心依赖已安装")
     except ImportError as e:
         print(f"❌ 缺少依赖: {e}")
         print("请运行: pip install -r requirements.txt")
         sys.exit(1)
 
+
 def setup_environment():
     """设置环境"""
     # 检查.env文件
@@ -38,40 +51,217 @@ def setup_environment():
         else:
             print("⚠️  未找到环境配置文件")
 
+
 def start_server():
     """启动服务器"""
+    from app.core.config import settings
+
     print("🚀 启动 FastAPI 服务器...")
     print("📍 服务地址: http://localhost:8000")
     print("📚 API 文档: http://localhost:8000/docs")
     print("📖 ReDoc 文档: http://localhost:8000/redoc")
     print("💚 健康检查: http://localhost:8000/health")
     print("=" * 50)
-    
+
     try:
         # 使用 uvicorn 启动服务器
-        subprocess.run([
-            sys.executable, "-m", "uvicorn", 
-            "app.main:app", 
-            "--host", "0.0.0.0", 
-            "--port", "8000", 
-            "--reload"
-        ])
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "app.main:app",
+                "--host",
+                "0.0.0.0",
+                "--port",
+                "8000",
+                "--reload",
+                "--forwarded-allow-ips",
+                settings.FORWARDED_ALLOW_IPS,
+            ]
+        )
     except KeyboardInterrupt:
         print("\n👋 服务器已停止")
 
+
+def get_cpu_count():
+    """获取当前进程可用的CPU核数（考虑容器和taskset的CPU亲和性限制）"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def get_worker_count(settings):
+    """
+    计算生产模式的工作进程数
+
+    Args:
+        settings: 应用配置
+
+    Returns:
+        WORKERS大于0时直接使用，否则为 CPU核数 × WORKERS_PER_CORE（不超过MAX_WORKERS）
+    """
+    if settings.WORKERS > 0:
+        return settings.WORKERS
+    workers = max(1, int(get_cpu_count() * settings.WORKERS_PER_CORE))
+    if settings.MAX_WORKERS > 0:
+        workers = min(workers, settings.MAX_WORKERS)
+    return workers
+
+
+# 只在当前进程内生效的后端配置项及多进程部署时的影响
+PROCESS_LOCAL_BACKENDS = {
+    "TOKEN_REVOCATION_BACKEND": "已登出或已刷新的令牌在其他工作进程中仍然有效",
+    "CACHE_BACKEND": "用户信息变更后只有处理该请求的工作进程的缓存失效",
+    "RATE_LIMIT_BACKEND": "各工作进程分别计数，登录限流的实际上限为配置值 × 工作进程数",
+}
+
+
+def check_process_local_backends(settings, workers):
+    """
+    检查多进程部署时仍使用进程内存储（memory）的后端
+
+    Args:
+        settings: 应用配置
+        workers: 工作进程数
+
+    Returns:
+        (配置项, 影响) 列表，单进程或全部使用共享后端时为空
+    """
+    if workers <= 1:
+        return []
+    return [(name, impact) for name, impact in PROCESS_LOCAL_BACKENDS.items() if getattr(settings, name) == "memory"]
+
+
+def setup_multiprocess_metrics():
+    """
+    准备Prometheus多进程指标目录
+
+    必须在导入应用之前设置环境变量；未配置时创建临时目录。
+    清理上次运行残留的指标文件，避免已退出进程的计数被重复统计。
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        path = tempfile.mkdtemp(prefix="prometheus-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    os.makedirs(path, exist_ok=True)
+    for filename in glob.glob(os.path.join(path, "*.db")):
+        os.remove(filename)
+    return path
+
+
+def post_fork(server, worker):
+    """gunicorn钩子：工作进程fork后丢弃从主进程继承的数据库连接池（不关闭主进程的连接）"""
+    from app.database.database import async_engine, engine, replica_set
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    for replica in replica_set.engines:
+        replica.sync_engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    """gunicorn钩子：工作进程退出后清理其多进程指标中的实时值"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def start_production_server():
+    """
+    以生产模式启动服务器
+
+    gunicorn主进程预加载应用后fork出工作进程，各进程共享导入阶段的内存页；
+    工作进程使用uvicorn运行（安装了uvloop和httptools时自动使用），处理
+    WORKER_MAX_REQUESTS（加随机偏移）个请求后平滑退出并由主进程补充新进程，
+    各进程错开重启，控制内存增长。
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ 生产模式需要 gunicorn（仅支持类Unix系统），请运行: pip install -r requirements.txt")
+        sys.exit(1)
+
+    from app.core.config import settings
+
+    workers = get_worker_count(settings)
+    metrics_dir = setup_multiprocess_metrics()
+    options = {
+        "bind": f"{settings.HOST}:{settings.PORT}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "max_requests": settings.WORKER_MAX_REQUESTS,
+        "max_requests_jitter": settings.WORKER_MAX_REQUESTS_JITTER,
+        "graceful_timeout": settings.WORKER_GRACEFUL_TIMEOUT,
+        # UvicornWorker按此配置信任代理的X-Forwarded-For，限流等按还原后的客户端IP处理
+        "forwarded_allow_ips": settings.FORWARDED_ALLOW_IPS,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+    }
+
+    class Application(BaseApplication):
+        """使用上述配置运行 app.main:app 的gunicorn应用"""
+
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+
+            return app
+
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    print("🚀 以生产模式启动 FastAPI 服务器...")
+    print(f"📍 监听地址: {options['bind']}")
+    print(f"👷 工作进程: {workers}（可用CPU核数 {get_cpu_count()}）")
+    print(f"⚙️  事件循环: {loop}，HTTP解析: {http}")
+    for name, impact in check_process_local_backends(settings, workers):
+        print(f"⚠️  {name}=memory：{impact}，多进程部署请改为 redis")
+    if settings.WORKER_MAX_REQUESTS:
+        print(
+            f"♻️  每个进程处理 {settings.WORKER_MAX_REQUESTS}"
+            f"~{settings.WORKER_MAX_REQUESTS + settings.WORKER_MAX_REQUESTS_JITTER} 个请求后平滑重启"
+        )
+    if not settings.DATABASE_URL.startswith("sqlite"):
+        connections = workers * (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+        print(f"🗄️  数据库连接数上限: {connections}（{workers} 进程 × {settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW}）")
+    print(f"📊 多进程指标目录: {metrics_dir}")
+    print("=" * 50)
+
+    Application().run()
+
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="FastAPI 项目启动脚本")
+    parser.add_argument("--prod", action="store_true", help="以生产模式启动（多进程，不自动重载）")
+    parser.add_argument("--profile-startup", action="store_true", help="分析导入和启动各阶段耗时后退出")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from app.core.config import settings
+        from app.core.startup import profile_startup
+
+        sys.exit(profile_startup(top=15, budget_ms=settings.STARTUP_BUDGET_MS))
+
     print("=" * 50)
     print("🎯 FastAPI 接口项目启动器")
     print("=" * 50)
-    
+
     # 检查环境
     check_python_version()
     check_dependencies()
     setup_environment()
-    
+
     # 启动服务器
-    start_server()
+    if args.prod:
+        start_production_server()
+    else:
+        start_server()
+
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,96 @@
+"""
+测试公共配置
+
+导入应用之前将数据库指向临时SQLite文件，并关闭登录限流、降低密码哈希成本；
+每个测试前重建数据表并清空进程内缓存。
+"""
+import os
+import tempfile
+
+_test_dir = tempfile.mkdtemp(prefix="app-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_test_dir}/test.db"
+os.environ["LOGIN_IP_LIMIT"] = "0"
+os.environ["LOGIN_USERNAME_LIMIT"] = "0"
+os.environ["LAST_LOGIN_FLUSH_INTERVAL"] = "0"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.cache import MemoryCacheBackend, user_cache  # noqa: E402
+from app.core.deps import principal_cache  # noqa: E402
+from app.core.security import get_password_hash, token_cache  # noqa: E402
+from app.database.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def reset_database():
+    """重建数据表并清空缓存，各测试互不影响"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    principal_cache.clear()
+    token_cache.clear()
+    if isinstance(user_cache, MemoryCacheBackend):
+        user_cache._cache.clear()
+    yield
+
+
+@pytest.fixture
+def db():
+    """同步数据库会话"""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    """执行应用生命周期的测试客户端"""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def create_user(db, username: str, password: str = "password123", **fields) -> User:
+    """
+    直接在数据库中创建用户
+
+    Args:
+        db: 同步数据库会话
+        username: 用户名
+        password: 密码
+        fields: 其他列值
+
+    Returns:
+        用户对象
+    """
+    user = User(
+        username=username,
+        email=f"{username}@example.com",
+        hashed_password=get_password_hash(password),
+        **fields,
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def auth_headers(client: TestClient, username: str, password: str = "password123") -> dict:
+    """
+    登录并返回携带访问令牌的请求头
+
+    Args:
+        client: 测试客户端
+        username: 用户名
+        password: 密码
+
+    Returns:
+        Authorization请求头
+    """
+    response = client.post("/api/v1/auth/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
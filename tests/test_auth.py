@@ -2,33 +2,22 @@
 JWT认证功能测试
 """
 
+import asyncio
+
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
 from app.main import app
-from app.database.database import get_db
 from app.models.user import User
 from app.core.security import get_password_hash, create_access_token, verify_token
+from app.core.deps import principal_cache
+from tests.conftest import auth_headers, create_user
 
 client = TestClient(app)
 
 
-def get_test_db():
-    """获取测试数据库会话"""
-    # 这里应该使用测试数据库
-    from app.database.database import SessionLocal
-
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-app.dependency_overrides[get_db] = get_test_db
-
-
 @pytest.fixture
 def test_user(db: Session):
     """创建测试用户"""
@@ -120,6 +109,25 @@ def test_refresh_token(test_user):
     assert "refresh_token" in data
 
 
+def test_refresh_token_single_use(test_user):
+    """测试同一刷新令牌的并发请求只有一个成功，之后再次使用被拒绝"""
+    login_data = {"username": "testuser", "password": "testpassword"}
+    refresh_data = {"refresh_token": client.post("/api/v1/auth/login", data=login_data).json()["refresh_token"]}
+
+    async def refresh_concurrently():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+            return await asyncio.gather(
+                *(http_client.post("/api/v1/auth/refresh", json=refresh_data) for _ in range(3))
+            )
+
+    responses = asyncio.run(refresh_concurrently())
+    assert sorted(response.status_code for response in responses) == [200, 401, 401]
+
+    response = client.post("/api/v1/auth/refresh", json=refresh_data)
+    assert response.status_code == 401
+
+
 def test_refresh_token_invalid():
     """测试无效刷新令牌"""
     refresh_data = {"refresh_token": "invalid_refresh_token"}
@@ -164,3 +172,36 @@ def test_superuser_endpoint(test_user):
     headers = {"Authorization": f"Bearer {token}"}
     response = client.post("/api/v1/users/", json={}, headers=headers)
     assert response.status_code == 403
+
+
+def test_principal_snapshot_invalidated_on_update(client, db):
+    """测试用户更新和停用后当前用户快照立即失效，停用的用户被拒绝"""
+    admin_headers = auth_headers(client, create_user(db, "admin", is_superuser=True).username)
+    user = create_user(db, "alice")
+    headers = auth_headers(client, "alice")
+
+    assert client.get("/api/v1/auth/me", headers=headers).json()["full_name"] is None
+    assert principal_cache.get("alice") is not None
+
+    response = client.put(f"/api/v1/users/{user.id}", json={"full_name": "Alice A"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert principal_cache.get("alice") is None
+    assert client.get("/api/v1/auth/me", headers=headers).json()["full_name"] == "Alice A"
+
+    response = client.put(f"/api/v1/users/{user.id}", json={"is_active": False}, headers=admin_headers)
+    assert response.status_code == 200
+    response = client.get("/api/v1/auth/me", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["error"]["message"] == "用户未激活"
+
+
+def test_principal_snapshot_invalidated_on_rename(client, db):
+    """测试修改用户名后旧用户名的快照失效，旧令牌不再对应任何用户"""
+    user = create_user(db, "alice")
+    headers = auth_headers(client, "alice")
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+
+    response = client.put(f"/api/v1/users/{user.id}", json={"username": "alice2"}, headers=headers)
+    assert response.status_code == 200
+    assert principal_cache.get("alice") is None
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
@@ -0,0 +1,55 @@
+"""
+基准测试工具测试
+"""
+from benchmarks.api import compare, percentile
+
+
+def test_percentile():
+    """测试最近秩法百分位数"""
+    values = [float(value) for value in range(1, 11)]
+    assert percentile(values, 50) == 5.0
+    assert percentile(values, 95) == 10.0
+    assert percentile(values, 99) == 10.0
+    assert percentile(values, 0) == 1.0
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_compare_threshold():
+    """测试吞吐量下降或延迟、分配上升超过阈值时报告回归，未超过阈值时通过"""
+    baseline = {
+        "me": {"throughput_rps": 1000.0, "p95_ms": 10.0, "p99_ms": 20.0, "alloc_peak_kib": 100.0},
+        "login": {"throughput_rps": 50.0, "p95_ms": 200.0, "p99_ms": 300.0},
+    }
+
+    within = {
+        "me": {"throughput_rps": 950.0, "p95_ms": 10.5, "p99_ms": 18.0, "alloc_peak_kib": 109.0},
+        "login": {"throughput_rps": 60.0, "p95_ms": 150.0, "p99_ms": 300.0},
+    }
+    assert compare(within, baseline, 0.1) == []
+
+    regressed = {
+        "me": {"throughput_rps": 800.0, "p95_ms": 12.0, "p99_ms": 20.0, "alloc_peak_kib": 150.0},
+        "login": {"throughput_rps": 50.0, "p95_ms": 200.0, "p99_ms": 300.0},
+    }
+    assert [(name, metric) for name, metric, *_ in compare(regressed, baseline, 0.1)] == [
+        ("me", "throughput_rps"),
+        ("me", "p95_ms"),
+        ("me", "alloc_peak_kib"),
+    ]
+    name, metric, old, new, change = compare(regressed, baseline, 0.1)[0]
+    assert (old, new) == (1000.0, 800.0)
+    assert abs(change + 0.2) < 1e-9
+
+    # 阈值放宽后不再视为回归
+    assert compare(regressed, baseline, 0.6) == []
+
+
+def test_compare_skips_missing_data():
+    """测试基准中没有的场景、缺少或为0的指标不参与对比"""
+    baseline = {"me": {"throughput_rps": 0.0, "p95_ms": 10.0}}
+    results = {
+        "me": {"throughput_rps": 1.0, "p95_ms": 10.0, "alloc_peak_kib": 500.0},
+        "get_user": {"throughput_rps": 1.0, "p95_ms": 1000.0},
+    }
+    assert compare(results, baseline, 0.1) == []
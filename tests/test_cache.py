@@ -0,0 +1,112 @@
+"""
+缓存模块测试
+"""
+import asyncio
+import time
+
+from app.core.cache import CacheBackend, MemoryCacheBackend, TTLCache
+
+
+def test_ttl_cache_get_and_set():
+    """测试缓存读写和命中统计"""
+    cache = TTLCache(maxsize=10, ttl=60)
+    assert cache.get("a") is None
+
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+def test_ttl_cache_expiration():
+    """测试条目过期"""
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_ttl_capped_by_default():
+    """测试单条目过期时间不超过默认过期时间"""
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1, ttl=3600)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_lru_eviction():
+    """测试超出容量时淘汰最久未使用的条目"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_disabled():
+    """测试容量为0时禁用缓存"""
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_memory_cache_backend():
+    """测试进程内响应缓存后端的读写、删除和命中率统计"""
+    backend = MemoryCacheBackend(maxsize=10, ttl=60)
+
+    async def run():
+        assert await backend.get("user:1") is None
+        await backend.set("user:1", b"body", ttl=60)
+        assert await backend.get("user:1") == b"body"
+        await backend.delete("user:1", "user:2")
+        assert await backend.get("user:1") is None
+
+    asyncio.run(run())
+    stats = backend.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["hit_ratio"] == 1 / 3
+
+
+def test_disabled_cache_backend():
+    """测试禁用缓存时始终未命中"""
+    backend = CacheBackend()
+
+    async def run():
+        await backend.set("user:1", b"body", ttl=60)
+        return await backend.get("user:1")
+
+    assert asyncio.run(run()) is None
+
+
+def test_memory_cache_backend_lease():
+    """测试回填租约：失效发生在读取数据库之后、回填之前时放弃回填"""
+    backend = MemoryCacheBackend(maxsize=10, ttl=60)
+
+    async def run():
+        lease = await backend.lease("user:1")
+        assert lease is not None
+        # 租约期间读取视为未命中，其他请求不能再获取租约
+        assert await backend.get("user:1") is None
+        assert await backend.lease("user:1") is None
+
+        # 读取数据库后发生失效，迟到的回填被放弃
+        await backend.delete("user:1")
+        assert not await backend.set_if_leased("user:1", lease, b"stale", ttl=60)
+        assert await backend.get("user:1") is None
+
+        lease = await backend.lease("user:1")
+        assert await backend.set_if_leased("user:1", lease, b"fresh", ttl=60)
+        assert await backend.get("user:1") == b"fresh"
+        assert await backend.lease("user:1") is None
+
+    asyncio.run(run())
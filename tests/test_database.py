@@ -0,0 +1,111 @@
+"""
+数据库会话和只读副本测试
+"""
+import asyncio
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from app.database import database
+from app.database.database import (
+    ReplicaSet,
+    async_engine,
+    get_async_database_url,
+    get_async_db,
+    get_read_db,
+)
+from app.models.user import User
+
+
+def test_replica_set_skips_unhealthy_replicas():
+    """测试不可用的副本被标记为不健康，选择时跳过，全部不可用时返回None"""
+    with tempfile.TemporaryDirectory() as directory:
+        healthy_url = "sqlite:///" + os.path.join(directory, "replica.db")
+        missing_url = "sqlite:///" + os.path.join(directory, "missing", "replica.db")
+        replicas = ReplicaSet([healthy_url, missing_url], "round_robin")
+
+        async def run():
+            try:
+                await replicas.check()
+                assert replicas.healthy == [True, False]
+                assert {replicas.choose() for _ in range(4)} == {replicas.engines[0]}
+
+                replicas.mark_unhealthy(0, "测试")
+                assert replicas.choose() is None
+            finally:
+                await replicas.stop()
+
+        asyncio.run(run())
+
+
+def test_use_primary_if_written(monkeypatch):
+    """测试粘滞期内写入过的记录改由主库读取，会话已在副本上开始事务时同样生效"""
+    with tempfile.TemporaryDirectory() as directory:
+        # 副本是没有数据表的空数据库，只有主库能查询用户表
+        replicas = ReplicaSet(["sqlite:///" + os.path.join(directory, "replica.db")], "least_connections")
+        monkeypatch.setattr(database, "replica_set", replicas)
+
+        async def run():
+            try:
+                reader = get_read_db()
+                db = await reader.__anext__()
+                try:
+                    await db.execute(select(1))
+                    await database.use_primary_if_written(db, "user:42")
+                    with pytest.raises(OperationalError):
+                        await db.execute(select(func.count()).select_from(User))
+                    await db.rollback()
+
+                    await db.execute(select(1))
+                    await database.mark_written("user:42")
+                    await database.use_primary_if_written(db, "user:42")
+                    assert await db.scalar(select(func.count()).select_from(User)) == 0
+                finally:
+                    await reader.aclose()
+            finally:
+                await replicas.stop()
+
+        asyncio.run(run())
+
+
+def test_get_async_database_url():
+    """测试同步URL转换为对应的异步驱动"""
+    assert get_async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert get_async_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert get_async_database_url("mysql://u:p@db/app") == "mysql+aiomysql://u:p@db/app"
+
+
+def test_get_async_db_commits_and_rolls_back():
+    """测试异步会话依赖：提交的写入可见，请求异常时未提交的写入被回滚"""
+
+    def row(username):
+        return {"username": username, "email": f"{username}@example.com", "hashed_password": "x"}
+
+    async def count_users():
+        reader = get_read_db()
+        db = await reader.__anext__()
+        try:
+            return await db.scalar(select(func.count()).select_from(User))
+        finally:
+            await reader.aclose()
+
+    async def run():
+        session = get_async_db()
+        db = await session.__anext__()
+        assert db.bind is async_engine
+        await db.execute(insert(User).values(**row("committed")))
+        await db.commit()
+        await session.aclose()
+
+        session = get_async_db()
+        db = await session.__anext__()
+        await db.execute(insert(User).values(**row("rolled_back")))
+        with pytest.raises(RuntimeError):
+            await session.athrow(RuntimeError("请求处理失败"))
+
+        return await count_users()
+
+    assert asyncio.run(run()) == 1
@@ -0,0 +1,56 @@
+"""
+ETag模块测试
+"""
+from datetime import datetime, timezone
+
+from app.core.etag import etag_matches, list_etag, user_etag
+from tests.conftest import auth_headers, create_user
+
+
+def test_user_etag():
+    """测试用户ETag随更新时间变化，无时区时间按UTC处理"""
+    updated_at = datetime(2024, 1, 2, 3, 4, 5, 123456)
+    etag = user_etag(1, updated_at)
+    assert etag.startswith('W/"1-')
+    assert etag == user_etag(1, updated_at.replace(tzinfo=timezone.utc))
+    assert etag != user_etag(1, updated_at.replace(microsecond=0))
+    assert etag != user_etag(2, updated_at)
+
+
+def test_list_etag():
+    """测试列表ETag与页内用户及响应形式相关"""
+    now = datetime(2024, 1, 2)
+    rows = [(1, now), (2, now)]
+    assert list_etag(rows, "list") == list_etag(list(rows), "list")
+    assert list_etag(rows, "list") != list_etag(rows, "page")
+    assert list_etag(rows, "list") != list_etag(rows[:1], "list")
+
+
+def test_etag_matches():
+    """测试If-None-Match弱比较"""
+    etag = 'W/"1-abc"'
+    assert etag_matches('W/"1-abc"', etag)
+    assert etag_matches('"1-abc"', etag)
+    assert etag_matches('W/"0-def", W/"1-abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('W/"1-abd"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_etag_changes_on_back_to_back_updates(client, db):
+    """测试同一秒内的连续更新产生不同的ETag，旧ETag不再命中"""
+    create_user(db, "alice")
+    headers = auth_headers(client, "alice")
+
+    etags = [client.get("/api/v1/users/me/profile", headers=headers).headers["etag"]]
+    for bio in ("first", "second"):
+        response = client.put("/api/v1/users/me/profile", json={"bio": bio}, headers=headers)
+        assert response.status_code == 200
+        etags.append(client.get("/api/v1/users/me/profile", headers=headers).headers["etag"])
+    assert len(set(etags)) == 3
+
+    response = client.get("/api/v1/users/me/profile", headers={**headers, "If-None-Match": etags[1]})
+    assert response.status_code == 200
+    assert response.json()["bio"] == "second"
+    response = client.get("/api/v1/users/me/profile", headers={**headers, "If-None-Match": etags[2]})
+    assert response.status_code == 304
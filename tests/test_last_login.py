@@ -0,0 +1,142 @@
+"""
+最后登录时间写入缓冲测试
+"""
+import asyncio
+import contextlib
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import last_login
+from app.core.deps import principal_cache
+from app.core.last_login import LastLoginBuffer
+from app.database.database import Base
+from app.models.user import User
+from tests.conftest import auth_headers, create_user
+
+
+def test_buffer_keeps_latest_and_flushes_in_batch(monkeypatch):
+    """测试同一用户只保留最新的登录时间，并批量写入数据库"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine("sqlite+aiosqlite:///" + os.path.join(directory, "test.db"))
+        monkeypatch.setattr(last_login, "async_engine", engine)
+        buffer = LastLoginBuffer(interval=60, max_entries=2)
+        now = datetime(2024, 1, 1, 12, 0, 0)
+
+        async def run():
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                    await conn.execute(
+                        insert(User),
+                        [
+                            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x"}
+                            for i in (1, 2)
+                        ],
+                    )
+
+                await buffer.record(1, "user1", now)
+                await buffer.record(1, "user1", now - timedelta(minutes=1))
+                assert buffer.pending == 1
+                assert not buffer._full.is_set()
+
+                await buffer.record(2, "user2", now)
+                assert buffer._full.is_set()
+
+                await buffer.stop()
+                assert buffer.pending == 0
+                async with engine.connect() as conn:
+                    rows = (await conn.execute(select(User.id, User.last_login).order_by(User.id))).all()
+                assert [(user_id, value.replace(tzinfo=None)) for user_id, value in rows] == [(1, now), (2, now)]
+            finally:
+                await engine.dispose()
+
+        asyncio.run(run())
+
+
+def test_failed_flush_keeps_entries(monkeypatch):
+    """测试写入失败时记录保留在缓冲区"""
+    with tempfile.TemporaryDirectory() as directory:
+        # 未建表，写入失败
+        engine = create_async_engine("sqlite+aiosqlite:///" + os.path.join(directory, "test.db"))
+        monkeypatch.setattr(last_login, "async_engine", engine)
+        buffer = LastLoginBuffer(interval=60, max_entries=100)
+
+        async def run():
+            try:
+                await buffer.record(1, "user1", datetime(2024, 1, 1))
+                assert await buffer.flush() == 0
+                assert buffer.pending == 1
+            finally:
+                await engine.dispose()
+
+        asyncio.run(run())
+
+
+class SlowEngine:
+    """写入前等待一段时间的引擎包装，用于模拟正在进行的写入"""
+
+    def __init__(self, engine, started):
+        self.engine = engine
+        self.started = started
+
+    @contextlib.asynccontextmanager
+    async def begin(self):
+        self.started.set()
+        await asyncio.sleep(0.1)
+        async with self.engine.begin() as conn:
+            yield conn
+
+
+def test_stop_waits_for_in_flight_flush(monkeypatch):
+    """测试后台写入进行中时停止，已取出的记录仍被写入"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine("sqlite+aiosqlite:///" + os.path.join(directory, "test.db"))
+        buffer = LastLoginBuffer(interval=60, max_entries=1)
+        now = datetime(2024, 1, 1, 12, 0, 0)
+
+        async def run():
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                    await conn.execute(
+                        insert(User),
+                        [{"id": 1, "username": "user1", "email": "user1@example.com", "hashed_password": "x"}],
+                    )
+                started = asyncio.Event()
+                monkeypatch.setattr(last_login, "async_engine", SlowEngine(engine, started))
+
+                await buffer.start()
+                await buffer.record(1, "user1", now)
+                # 后台任务已从缓冲区取出记录并开始写入
+                await started.wait()
+                assert buffer.pending == 0
+                await buffer.stop()
+
+                async with engine.connect() as conn:
+                    value = await conn.scalar(select(User.last_login).where(User.id == 1))
+                assert value.replace(tzinfo=None) == now
+            finally:
+                await engine.dispose()
+
+        asyncio.run(run())
+
+
+def test_flush_invalidates_principal_snapshot(client, db):
+    """测试最后登录时间写入后当前用户快照失效，/auth/me 返回新的登录时间"""
+    create_user(db, "alice")
+    headers = auth_headers(client, "alice")
+    before = client.get("/api/v1/auth/me", headers=headers)
+    assert principal_cache.get("alice") is not None
+
+    async def run():
+        await last_login.last_login_buffer.record(before.json()["id"], "alice", datetime(2030, 1, 1))
+
+    asyncio.run(run())
+    assert principal_cache.get("alice") is None
+    after = client.get("/api/v1/auth/me", headers=headers)
+    assert after.json()["last_login"].startswith("2030-01-01T00:00:00")
+    assert after.headers["etag"] != before.headers["etag"]
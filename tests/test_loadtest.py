@@ -0,0 +1,119 @@
+"""
+负载生成工具测试
+"""
+import argparse
+import asyncio
+
+import httpx
+import pytest
+
+from app import loadtest
+from app.loadtest import (
+    AccountSession,
+    find_knee,
+    login_accounts,
+    parse_profile,
+    parse_steps,
+    prepare_accounts,
+    run_step,
+)
+from app.main import app
+
+
+def test_parse_profile_and_steps():
+    """测试解析负载权重配置和并发阶梯"""
+    assert parse_profile("get_user=70,me=20,login=5,update_profile=5") == {
+        "get_user": 70,
+        "me": 20,
+        "login": 5,
+        "update_profile": 5,
+    }
+    with pytest.raises(ValueError):
+        parse_profile("unknown=1")
+    with pytest.raises(ValueError):
+        parse_profile("me=0")
+    with pytest.raises(ValueError):
+        parse_steps("10,5")
+
+
+def test_find_knee():
+    """测试扩展效率低于阈值或错误率超限时给出拐点"""
+
+    def steps(points, error_rate=0.0):
+        return [{"concurrency": c, "throughput_rps": t, "error_rate": error_rate} for c, t in points]
+
+    # 20 -> 40 并发时吞吐量只增长约32%，拐点为并发20
+    assert find_knee(steps([(10, 100), (20, 190), (40, 250), (80, 260)]), 0.5, 0.01) == 1
+    # 吞吐量持续线性增长，未出现拐点
+    assert find_knee(steps([(10, 100), (20, 200), (40, 400)]), 0.5, 0.01) is None
+
+    overloaded = steps([(10, 100), (20, 200), (40, 400)])
+    overloaded[2]["error_rate"] = 0.05
+    assert find_knee(overloaded, 0.5, 0.01) == 1
+
+
+def test_prepare_accounts_reuses_existing_accounts():
+    """测试再次运行时已注册的压测账号直接复用，每个账号登录一次"""
+    args = argparse.Namespace(username=None, password="loadtest-password", accounts=2, account_prefix="loadtest")
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await prepare_accounts(client, "/api/v1", args)
+            second = await prepare_accounts(client, "/api/v1", args)
+            sessions = await login_accounts(client, "/api/v1", second)
+        return first, second, sessions
+
+    first, second, sessions = asyncio.run(run())
+    assert (
+        first
+        == second
+        == [
+            {"username": "loadtest0", "password": "loadtest-password"},
+            {"username": "loadtest1", "password": "loadtest-password"},
+        ]
+    )
+    assert all(session.access_token for session in sessions)
+
+
+def mock_client(handler):
+    """创建使用模拟传输的httpx客户端"""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test")
+
+
+def test_shared_session_logs_in_once():
+    """测试共享同一会话的虚拟用户并发请求时只登录一次"""
+    logins = []
+
+    async def handler(request):
+        if request.url.path == "/api/v1/auth/login":
+            logins.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"access_token": "a", "refresh_token": "r", "expires_in": 60})
+        return httpx.Response(200, json={})
+
+    async def run():
+        async with mock_client(handler) as client:
+            session = AccountSession(client, "/api/v1", "user", "password")
+            return await asyncio.gather(*(session.request("GET", "/auth/me") for _ in range(5)))
+
+    assert [response.status_code for response in asyncio.run(run())] == [200] * 5
+    assert len(logins) == 1
+
+
+def test_rate_limited_login_is_recorded_as_failure(monkeypatch):
+    """测试登录被限流时请求计为429失败并退避，而不是中止压测"""
+    monkeypatch.setattr(loadtest, "BACKOFF_BASE", 0.01)
+
+    def handler(request):
+        return httpx.Response(429, headers={"Retry-After": "1"}, json={"error": {"message": "请求过于频繁"}})
+
+    async def run():
+        async with mock_client(handler) as client:
+            session = AccountSession(client, "/api/v1", "user", "password")
+            return await run_step([session, session], {"me": 1}, [1], 0.05, 0.0)
+
+    result = asyncio.run(run())
+    assert result["requests"] > 0
+    assert result["statuses"] == {"429": result["requests"]}
+    assert result["error_rate"] == 1.0
@@ -0,0 +1,77 @@
+"""
+日志模块测试
+"""
+import logging
+import queue
+
+import pytest
+import structlog
+
+from app.core.logging import LogSampler, _DroppingQueueHandler, _orjson_dumps
+
+
+def _sample(sampler: LogSampler, logger_name: str, level: str, event: str, times: int) -> list:
+    """多次调用采样处理器，返回未被丢弃的事件"""
+    logger = logging.getLogger(logger_name)
+    passed = []
+    for _ in range(times):
+        try:
+            passed.append(sampler(logger, level, {"event": event}))
+        except structlog.DropEvent:
+            pass
+    return passed
+
+
+def test_queue_handler_drops_when_full():
+    """测试队列已满时丢弃日志而不阻塞"""
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=1))
+    record = logging.makeLogRecord({"msg": "测试日志"})
+
+    handler.emit(record)
+    handler.emit(record)
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+def test_orjson_dumps():
+    """测试日志JSON序列化保留中文并兼容不可序列化的值"""
+    rendered = _orjson_dumps({"event": "用户登录成功", "error": ValueError("无效")})
+    assert rendered == '{"event":"用户登录成功","error":"无效"}'
+
+
+def test_log_sampler_ratio():
+    """测试按1/N采样，规则按日志记录器层级匹配"""
+    sampler = LogSampler({"app.api:info": "1/10"})
+    passed = _sample(sampler, "app.api.v1.endpoints.users", "info", "获取用户列表成功", 25)
+    assert len(passed) == 3
+    assert passed[0]["sample_rate"] == 10
+
+    # 其他级别和日志记录器不受影响
+    assert len(_sample(sampler, "app.api.v1.endpoints.users", "warning", "获取用户列表成功", 5)) == 5
+    assert len(_sample(sampler, "app.core.security", "info", "令牌验证成功", 5)) == 5
+
+
+def test_log_sampler_rate_limit(monkeypatch):
+    """测试每秒限流并在下一条日志中报告被抑制的条数"""
+    now = [100.0]
+    monkeypatch.setattr("app.core.logging.time.monotonic", lambda: now[0])
+    sampler = LogSampler({"*": "2/s"})
+
+    assert len(_sample(sampler, "app.core.security", "debug", "令牌验证成功", 5)) == 2
+    now[0] += 1.0
+    passed = _sample(sampler, "app.core.security", "debug", "令牌验证成功", 1)
+    assert passed[0]["suppressed"] == 3
+
+
+def test_log_sampler_errors_always_pass():
+    """测试错误日志不参与采样"""
+    sampler = LogSampler({"*": "0/s"})
+    assert len(_sample(sampler, "app", "error", "数据库会话异常", 3)) == 3
+    assert _sample(sampler, "app", "info", "数据库会话异常", 3) == []
+
+
+def test_log_sampler_invalid_rule():
+    """测试无效的采样规则"""
+    with pytest.raises(ValueError):
+        LogSampler({"*": "2/m"})
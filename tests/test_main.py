@@ -1,9 +1,13 @@
 """
 主应用测试
 """
+import asyncio
+
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
+from app.core.config import settings
 from app.main import app
 
 client = TestClient(app)
@@ -37,4 +41,50 @@ def test_docs_available():
 def test_redoc_available():
     """测试ReDoc文档是否可用"""
     response = client.get("/redoc")
-    assert response.status_code == 200 
\ No newline at end of file
+    assert response.status_code == 200 
+
+
+def test_metrics_endpoint(monkeypatch):
+    """测试Prometheus指标接口"""
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-token")
+    client.get("/health")
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "http_requests_total" in response.text
+
+
+def get_from(path, client_ip, headers=None):
+    """以指定客户端地址请求应用"""
+
+    async def run():
+        transport = httpx.ASGITransport(app=app, client=(client_ip, 12345))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+            return await http_client.get(path, headers=headers)
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("path", ["/metrics", "/internal/db-pool"])
+def test_monitoring_endpoints_require_trusted_network_or_token(monkeypatch, path):
+    """测试指标和连接池指标接口只允许可信网段或携带抓取令牌的请求访问"""
+    monkeypatch.setattr(settings, "METRICS_TRUSTED_NETWORKS", ["10.0.0.0/8"])
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-token")
+
+    assert get_from(path, "10.1.2.3").status_code == 200
+    assert get_from(path, "203.0.113.7").status_code == 403
+    assert get_from(path, "203.0.113.7", {"Authorization": "Bearer wrong"}).status_code == 403
+    assert get_from(path, "203.0.113.7", {"Authorization": "Bearer scrape-token"}).status_code == 200
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    assert get_from(path, "203.0.113.7", {"Authorization": "Bearer scrape-token"}).status_code == 403
+
+
+def test_db_pool_stats(monkeypatch):
+    """测试数据库连接池指标接口"""
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-token")
+    assert client.get("/internal/db-pool").status_code == 403
+
+    response = client.get("/internal/db-pool", headers={"Authorization": "Bearer scrape-token"})
+    assert response.status_code == 200
+    assert "primary" in response.json()
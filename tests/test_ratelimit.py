@@ -0,0 +1,76 @@
+"""
+限流模块测试
+"""
+import asyncio
+
+import httpx
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from app.api.v1.endpoints import auth
+from app.core.ratelimit import SlidingWindowLimiter
+from app.main import app
+
+
+def test_sliding_window_limiter():
+    """测试超出限制后拒绝并返回等待秒数"""
+    limiter = SlidingWindowLimiter("test_limit", limit=3, window=60)
+
+    async def run():
+        return [await limiter.hit("127.0.0.1") for _ in range(4)]
+
+    results = asyncio.run(run())
+    assert results[:3] == [0, 0, 0]
+    assert 1 <= results[3] <= 60
+
+
+def test_sliding_window_limiter_check_only(monkeypatch):
+    """测试只检查不计数，以及上一窗口计数按剩余比例衰减"""
+    now = [6000.0]
+    monkeypatch.setattr("app.core.ratelimit.time.time", lambda: now[0])
+    limiter = SlidingWindowLimiter("test_check", limit=2, window=60)
+
+    async def run():
+        assert await limiter.hit("alice", cost=0) == 0
+        await limiter.hit("alice")
+        await limiter.hit("alice")
+        assert await limiter.hit("alice", cost=0) > 0
+        assert await limiter.hit("bob", cost=0) == 0
+
+        # 下一窗口过半时，上一窗口的2次按一半计入
+        now[0] += 90
+        assert await limiter.hit("alice", cost=0) == 0
+
+    asyncio.run(run())
+
+
+def test_sliding_window_limiter_disabled():
+    """测试次数为0时不限流"""
+    limiter = SlidingWindowLimiter("test_disabled", limit=0, window=60)
+    assert asyncio.run(limiter.hit("127.0.0.1")) == 0
+
+
+def test_login_ip_limit_behind_proxy(monkeypatch):
+    """测试位于可信代理之后时按X-Forwarded-For中的客户端IP限流，不可信来源的代理头被忽略"""
+    monkeypatch.setattr(auth, "login_ip_limiter", SlidingWindowLimiter("test_login_ip", limit=1, window=60))
+    # 与工作进程相同的代理头处理（gunicorn的forwarded_allow_ips配置）
+    proxied_app = ProxyHeadersMiddleware(app, trusted_hosts="172.28.0.10")
+    form = {"username": "nobody", "password": "wrongpassword"}
+
+    async def login(peer_ip, forwarded_for):
+        transport = httpx.ASGITransport(app=proxied_app, client=(peer_ip, 40000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/v1/auth/login", data=form, headers={"X-Forwarded-For": forwarded_for})
+            return response.status_code
+
+    async def run():
+        return [
+            # 经nginx转发的两个客户端分别计数
+            await login("172.28.0.10", "198.51.100.1"),
+            await login("172.28.0.10", "198.51.100.2"),
+            await login("172.28.0.10", "198.51.100.1"),
+            # 直连客户端伪造的代理头不生效，按连接地址计数
+            await login("203.0.113.9", "198.51.100.3"),
+            await login("203.0.113.9", "198.51.100.4"),
+        ]
+
+    assert asyncio.run(run()) == [401, 401, 429, 401, 429]
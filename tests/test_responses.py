@@ -0,0 +1,32 @@
+"""
+响应模块测试
+"""
+from datetime import datetime, timezone
+
+from app.core.responses import ORJSONResponse, user_to_dict
+from app.models.user import User
+from app.schemas.user import UserResponse
+
+
+def test_orjson_response_datetime():
+    """测试datetime序列化与pydantic输出一致"""
+    created_at = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    response = ORJSONResponse({"created_at": created_at})
+    assert response.body == b'{"created_at":"2024-01-02T03:04:05Z"}'
+    assert response.media_type == "application/json"
+
+
+def test_user_to_dict_matches_response_model():
+    """测试快速通道输出与UserResponse序列化结果一致"""
+    user = User(
+        id=1,
+        username="testuser",
+        email="test@example.com",
+        full_name="测试用户",
+        is_active=True,
+        is_superuser=False,
+        created_at=datetime(2024, 1, 2, 3, 4, 5, 123456),
+        updated_at=datetime(2024, 1, 2, 3, 4, 5, 123456),
+    )
+    expected = UserResponse.model_validate(user).model_dump_json().encode()
+    assert ORJSONResponse(user_to_dict(user)).body == expected
@@ -0,0 +1,142 @@
+"""
+安全模块测试
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import (
+    PasswordHashPool,
+    build_password_context,
+    create_access_token,
+    create_refresh_token,
+    get_password_hash,
+    hash_password_async,
+    revoke_token,
+    token_cache,
+    verify_and_update_password_async,
+    verify_password_async,
+    verify_token,
+)
+
+
+def test_verify_token_uses_cache():
+    """测试同一令牌只校验一次签名"""
+    token_cache.clear()
+    token = create_access_token("cacheuser")
+
+    hits = token_cache.hits
+    assert verify_token(token, "access")["sub"] == "cacheuser"
+    assert verify_token(token, "access")["sub"] == "cacheuser"
+    assert token_cache.hits == hits + 1
+
+
+def test_verify_token_cached_type_still_checked():
+    """测试缓存命中时仍然校验令牌类型"""
+    token = create_refresh_token("cacheuser")
+    verify_token(token, "refresh")
+
+    with pytest.raises(HTTPException) as exc_info:
+        verify_token(token, "access")
+    assert exc_info.value.status_code == 401
+
+
+def test_revoke_token():
+    """测试撤销后的令牌即使已在缓存中也验证失败，且不影响其他令牌"""
+    token = create_access_token("revokeuser")
+    other = create_access_token("revokeuser")
+    assert verify_token(token, "access")["jti"] != verify_token(other, "access")["jti"]
+
+    assert asyncio.run(revoke_token(token))
+    with pytest.raises(HTTPException) as exc_info:
+        verify_token(token, "access")
+    assert exc_info.value.detail == "令牌已被撤销"
+    assert verify_token(other, "access")["sub"] == "revokeuser"
+
+    assert not asyncio.run(revoke_token("invalid-token"))
+
+
+def test_revoke_token_once():
+    """测试并发撤销同一令牌时只有一次撤销成功"""
+    token = create_access_token("revokeuser")
+
+    async def revoke_concurrently():
+        return await asyncio.gather(*(revoke_token(token) for _ in range(3)))
+
+    assert sorted(asyncio.run(revoke_concurrently())) == [False, False, True]
+    assert not asyncio.run(revoke_token(token))
+
+
+def test_hash_and_verify_password_async():
+    """测试异步密码哈希和验证"""
+
+    async def run():
+        hashed = await hash_password_async("testpassword")
+        assert await verify_password_async("testpassword", hashed)
+        assert not await verify_password_async("wrongpassword", hashed)
+
+    asyncio.run(run())
+
+
+def test_verify_password_async_matches_sync_hash():
+    """测试异步验证兼容同步生成的哈希"""
+    hashed = get_password_hash("testpassword")
+    assert asyncio.run(verify_password_async("testpassword", hashed))
+
+
+def test_password_hash_pool_rejects_when_queue_full():
+    """测试队列已满时拒绝新任务"""
+    pool = PasswordHashPool(executor_type="thread", max_workers=1, max_queue=1, timeout=5.0)
+
+    async def run():
+        tasks = [asyncio.ensure_future(pool.run(time.sleep, 0.2)) for _ in range(3)]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        assert len(rejected) == 1
+        assert rejected[0].status_code == 503
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["pending"] == 0
+
+
+def test_password_hash_pool_timeout():
+    """测试等待超时"""
+    pool = PasswordHashPool(executor_type="thread", max_workers=1, max_queue=1, timeout=0.05)
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(pool.run(time.sleep, 0.5))
+    pool.shutdown()
+
+    assert exc_info.value.status_code == 503
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_password_context_needs_update_on_rounds_change():
+    """测试成本参数变化（升高或降低）时旧哈希需要更新"""
+    low = build_password_context(["bcrypt"], 4, 3, 65536, 4)
+    high = build_password_context(["bcrypt"], 5, 3, 65536, 4)
+    hashed = low.hash("testpassword")
+
+    assert not low.needs_update(hashed)
+    assert high.needs_update(hashed)
+    assert low.needs_update(high.hash("testpassword"))
+
+    verified, new_hash = high.verify_and_update("testpassword", hashed)
+    assert verified
+    assert new_hash.startswith("$2b$05$")
+
+
+def test_verify_and_update_password_async():
+    """测试当前配置下生成的哈希无需更新"""
+    hashed = get_password_hash("testpassword")
+    assert asyncio.run(verify_and_update_password_async("testpassword", hashed)) == (True, None)
+    assert asyncio.run(verify_and_update_password_async("wrongpassword", hashed)) == (False, None)
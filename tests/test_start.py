@@ -0,0 +1,19 @@
+"""
+启动脚本测试
+"""
+from types import SimpleNamespace
+
+from start import check_process_local_backends
+
+
+def test_check_process_local_backends():
+    """测试多进程部署时提示仍使用进程内存储的后端"""
+    settings = SimpleNamespace(TOKEN_REVOCATION_BACKEND="memory", CACHE_BACKEND="redis", RATE_LIMIT_BACKEND="memory")
+    assert [name for name, _ in check_process_local_backends(settings, 4)] == [
+        "TOKEN_REVOCATION_BACKEND",
+        "RATE_LIMIT_BACKEND",
+    ]
+    assert check_process_local_backends(settings, 1) == []
+
+    shared = SimpleNamespace(TOKEN_REVOCATION_BACKEND="redis", CACHE_BACKEND="none", RATE_LIMIT_BACKEND="redis")
+    assert check_process_local_backends(shared, 4) == []
@@ -0,0 +1,27 @@
+"""
+启动耗时分析测试
+"""
+from app.core.startup import get_startup_phases, parse_importtime, startup_phase
+
+
+def test_parse_importtime():
+    """测试按顶层包汇总各模块自身的导入耗时"""
+    output = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:      1000 |       1000 |   sqlalchemy.sql",
+            "import time:      2000 |       3000 | sqlalchemy",
+            "import time:       500 |        500 | app.main",
+            "其他输出",
+        ]
+    )
+    total, packages = parse_importtime(output)
+    assert packages == {"sqlalchemy": 0.003, "app": 0.0005}
+    assert abs(total - 0.0035) < 1e-9
+
+
+def test_startup_phase():
+    """测试记录启动阶段耗时"""
+    with startup_phase("test_phase"):
+        pass
+    assert get_startup_phases()["test_phase"] >= 0
@@ -0,0 +1,69 @@
+"""
+Server-Timing中间件测试
+"""
+import asyncio
+
+import httpx
+from fastapi import APIRouter, FastAPI
+
+from app.core import timing
+from app.core.config import Settings, settings
+from app.core.timing import ServerTimingMiddleware, TimedRoute, timed
+
+
+def create_test_app(trusted_networks):
+    """创建带有hash阶段计时的测试应用"""
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.post("/login")
+    async def login():
+        with timed("hash"):
+            pass
+        return {"ok": True}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ServerTimingMiddleware, trusted_networks=trusted_networks)
+    return app
+
+
+def request_login(app, client_ip):
+    """以指定客户端地址请求测试应用"""
+
+    async def run():
+        transport = httpx.ASGITransport(app=app, client=(client_ip, 12345))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/login")
+
+    return asyncio.run(run())
+
+
+def test_header_only_for_trusted_clients(monkeypatch):
+    """测试只有可信网段的客户端收到各阶段耗时"""
+    monkeypatch.setattr(settings, "SERVER_TIMING_SAMPLE_RATE", 1.0)
+    app = create_test_app(["10.0.0.0/8", "::1/128"])
+
+    header = request_login(app, "10.1.2.3").headers["server-timing"]
+    assert "hash;dur=" in header
+    assert "total;dur=" in header
+
+    response = request_login(app, "203.0.113.7")
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+
+    # 没有可信网段时不向任何客户端返回
+    assert "server-timing" not in request_login(create_test_app([]), "10.1.2.3").headers
+
+
+def test_default_sample_rate(monkeypatch):
+    """测试默认按1%采样，采样到的可信客户端请求返回Server-Timing响应头"""
+    default = Settings.__fields__["SERVER_TIMING_SAMPLE_RATE"].default
+    assert default == 0.01
+    monkeypatch.setattr(settings, "SERVER_TIMING_SAMPLE_RATE", default)
+    app = create_test_app(["127.0.0.1/32"])
+
+    monkeypatch.setattr(timing.random, "random", lambda: 0.005)
+    assert "hash;dur=" in request_login(app, "127.0.0.1").headers["server-timing"]
+
+    monkeypatch.setattr(timing.random, "random", lambda: 0.5)
+    assert "server-timing" not in request_login(app, "127.0.0.1").headers
@@ -0,0 +1,268 @@
+"""
+用户管理功能测试
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.endpoints import users as users_endpoint
+from app.api.v1.endpoints.users import _csv_value, _decode_cursor, _encode_cursor
+from app.core.cache import invalidate_user_cache
+from app.core.config import settings
+from app.core.deps import duplicate_user_message
+from app.core.security import get_password_hash
+from app.database.database import async_engine, engine
+from app.models.user import User
+from app.core.exceptions import ValidationException
+from tests.conftest import auth_headers, create_user
+
+
+def test_cursor_round_trip():
+    """测试分页游标编码和解码"""
+    for user_id in (1, 42, 10**9):
+        assert _decode_cursor(_encode_cursor(user_id)) == user_id
+
+
+def test_invalid_cursor():
+    """测试无效分页游标"""
+    with pytest.raises(ValidationException):
+        _decode_cursor("!!invalid")
+
+
+def test_duplicate_user_message():
+    """测试将唯一约束冲突映射为用户名或邮箱已存在"""
+
+    def error(message):
+        return IntegrityError("INSERT INTO users ...", {}, Exception(message))
+
+    assert duplicate_user_message(error("UNIQUE constraint failed: users.username")) == "用户名已存在"
+    assert duplicate_user_message(error("UNIQUE constraint failed: users.email")) == "邮箱已存在"
+    assert duplicate_user_message(error('duplicate key value violates unique constraint "ix_users_email"')) == "邮箱已存在"
+    assert duplicate_user_message(error("Duplicate entry 'a' for key 'users.ix_users_username'")) == "用户名已存在"
+    assert duplicate_user_message(error("NOT NULL constraint failed: users.hashed_password")) is None
+    assert duplicate_user_message(error("NOT NULL constraint failed: users.email")) is None
+
+
+def test_bulk_import_ndjson_reports_row_errors(client, db):
+    """测试NDJSON批量导入：逐行报告结果，无效行不影响其他行"""
+    create_user(db, "admin", is_superuser=True)
+    create_user(db, "existing")
+    headers = auth_headers(client, "admin")
+    lines = [
+        b'{"username": "alice", "email": "alice@example.com", "password": "secret123"}',
+        b'{"username": "existing", "email": "other@example.com", "password": "secret123"}',
+        b'{"username": 123, "email": "num@example.com", "password": "secret123"}',
+        b"not json",
+        b'{"username": "bad\xff", "email": "bad@example.com"}',
+        b"",
+        b'{"username": "alice", "email": "alice2@example.com", "password": "secret123"}',
+        b'{"username": "bob", "email": "bob@example.com", "password": "secret123"}',
+    ]
+
+    response = client.post("/api/v1/users/bulk", content=b"\n".join(lines), headers=headers)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["total"], result["created"], result["failed"]) == (7, 2, 5)
+
+    rows = {row["line"]: row for row in result["results"]}
+    assert rows[1]["status"] == "created"
+    assert rows[2]["error"] == "用户名已存在"
+    assert rows[3]["status"] == "error"
+    assert rows[3]["username"] == "123"
+    assert rows[4]["error"] == "JSON格式无效"
+    assert rows[5]["error"] == "编码无效，应为UTF-8"
+    assert rows[7]["error"] == "用户名已存在"
+    assert rows[8]["status"] == "created"
+
+    assert auth_headers(client, "bob", "secret123")
+
+
+def test_bulk_import_csv(client, db):
+    """测试CSV批量导入和列数校验"""
+    create_user(db, "admin", is_superuser=True)
+    headers = {**auth_headers(client, "admin"), "Content-Type": "text/csv"}
+    body = "username,email,password\ncarol,carol@example.com,secret123\ndave,dave@example.com\n"
+
+    response = client.post("/api/v1/users/bulk", content=body.encode(), headers=headers)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["total"], result["created"], result["failed"]) == (2, 1, 1)
+    assert result["results"][0]["username"] == "carol"
+    assert result["results"][1]["error"] == "CSV列数与表头不一致"
+
+    # 非超级用户无权导入
+    create_user(db, "user")
+    response = client.post("/api/v1/users/bulk", content=body.encode(), headers=auth_headers(client, "user"))
+    assert response.status_code == 403
+
+
+def test_bulk_import_busy_returns_partial_report(client, db, monkeypatch):
+    """测试密码哈希服务繁忙时返回逐行报告：已提交的批次保留，其余行标记为服务繁忙"""
+    create_user(db, "admin", is_superuser=True)
+    headers = auth_headers(client, "admin")
+    monkeypatch.setattr(settings, "BULK_IMPORT_BATCH_SIZE", 2)
+    calls = []
+
+    async def hash_then_busy(passwords):
+        calls.append(passwords)
+        if len(calls) > 1:
+            raise HTTPException(status_code=503, detail="服务繁忙，请稍后重试")
+        return [get_password_hash(password) for password in passwords]
+
+    monkeypatch.setattr(users_endpoint, "hash_passwords_async", hash_then_busy)
+    lines = [
+        f'{{"username": "user{i}", "email": "user{i}@example.com", "password": "secret123"}}'.encode() for i in range(5)
+    ]
+    lines.insert(3, b"not json")
+
+    response = client.post("/api/v1/users/bulk", content=b"\n".join(lines), headers=headers)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["total"], result["created"], result["failed"]) == (6, 2, 4)
+    assert [(row["line"], row["status"], row["error"]) for row in result["results"]] == [
+        (1, "created", None),
+        (2, "created", None),
+        (3, "error", "服务繁忙"),
+        (4, "error", "JSON格式无效"),
+        (5, "error", "服务繁忙"),
+        (6, "error", "服务繁忙"),
+    ]
+    # 服务繁忙后不再尝试哈希
+    assert len(calls) == 2
+    assert db.query(User).filter(User.username.like("user%")).count() == 2
+
+
+def test_get_user_cache_not_filled_after_concurrent_invalidation(client, db, monkeypatch):
+    """测试读取数据库后用户被更新并失效缓存时，旧数据不会写回缓存"""
+    user = create_user(db, "alice", bio="old")
+    original_get = AsyncSession.get
+
+    async def get_then_concurrent_update(self, *args, **kwargs):
+        # 模拟读取完成后，另一个请求提交了更新并使缓存失效
+        result = await original_get(self, *args, **kwargs)
+        with engine.begin() as conn:
+            conn.execute(update(User).where(User.id == user.id).values(bio="new"))
+        await invalidate_user_cache(user.id)
+        return result
+
+    monkeypatch.setattr(AsyncSession, "get", get_then_concurrent_update)
+    assert client.get(f"/api/v1/users/{user.id}").json()["bio"] == "old"
+    monkeypatch.setattr(AsyncSession, "get", original_get)
+
+    assert client.get(f"/api/v1/users/{user.id}").json()["bio"] == "new"
+    # 之后的读取正常回填并命中缓存
+    assert client.get(f"/api/v1/users/{user.id}").json()["bio"] == "new"
+
+
+def test_export_users(client, db, monkeypatch):
+    """测试按格式流式导出用户，以及按激活状态和创建时间过滤"""
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 1)
+    create_user(db, "alice", created_at=datetime(2024, 1, 1))
+    create_user(db, "bob", is_active=False, created_at=datetime(2024, 2, 1))
+    create_user(db, "carol", created_at=datetime(2024, 3, 1))
+    headers = auth_headers(client, "alice")
+
+    response = client.get("/api/v1/users/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["content-disposition"] == 'attachment; filename="users.ndjson"'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["username"] for row in rows] == ["alice", "bob", "carol"]
+    assert "hashed_password" not in rows[0]
+    assert rows[0]["created_at"].startswith("2024-01-01T00:00:00")
+    # 字段和时间格式与单用户查询的JSON响应一致
+    assert rows[0] == client.get(f"/api/v1/users/{rows[0]['id']}", headers=headers).json()
+
+    response = client.get("/api/v1/users/export?format=ndjson&is_active=false", headers=headers)
+    assert [json.loads(line)["username"] for line in response.text.splitlines()] == ["bob"]
+
+    response = client.get(
+        "/api/v1/users/export",
+        params={"format": "csv", "created_after": "2024-01-15T00:00:00", "created_before": "2024-03-01T00:00:00"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="users.csv"'
+    reader = list(csv.reader(io.StringIO(response.text)))
+    assert reader[0][:3] == ["username", "email", "full_name"]
+    assert [dict(zip(reader[0], row))["username"] for row in reader[1:]] == ["bob"]
+    bob = dict(zip(reader[0], reader[1]))
+    assert bob["updated_at"] == client.get(f"/api/v1/users/{bob['id']}", headers=headers).json()["updated_at"]
+
+    # 带时区的UTC时间与JSON响应一样输出为"Z"后缀
+    assert _csv_value(datetime(2024, 1, 1, tzinfo=timezone.utc)) == "2024-01-01T00:00:00Z"
+
+    assert client.get("/api/v1/users/export?format=xml", headers=headers).status_code == 422
+    assert client.get("/api/v1/users/export").status_code == 401
+
+
+def test_duplicate_username_and_email_on_write(client, db):
+    """测试注册、创建和更新时用户名或邮箱重复返回原有的错误提示"""
+    create_user(db, "admin", is_superuser=True)
+    bob = create_user(db, "bob")
+    admin_headers = auth_headers(client, "admin")
+
+    response = client.post(
+        "/api/v1/auth/register", json={"username": "bob", "email": "new@example.com", "password": "secret123"}
+    )
+    assert response.status_code == 401
+    assert response.json()["error"]["message"] == "用户名已存在"
+    response = client.post(
+        "/api/v1/auth/register", json={"username": "new", "email": "bob@example.com", "password": "secret123"}
+    )
+    assert response.status_code == 401
+    assert response.json()["error"]["message"] == "邮箱已存在"
+
+    response = client.post(
+        "/api/v1/users/",
+        json={"username": "bob", "email": "other@example.com", "password": "secret123"},
+        headers=admin_headers,
+    )
+    assert response.status_code == 422
+    assert response.json()["error"]["message"] == "用户名已存在"
+
+    response = client.put(f"/api/v1/users/{bob.id}", json={"email": "admin@example.com"}, headers=admin_headers)
+    assert response.status_code == 422
+    assert response.json()["error"]["message"] == "邮箱已存在"
+
+    response = client.put("/api/v1/users/me/profile", json={"username": "bob"}, headers=admin_headers)
+    assert response.status_code == 422
+    assert response.json()["error"]["message"] == "用户名已存在"
+
+
+def test_partial_update_sets_only_submitted_columns(client, db):
+    """测试部分更新只修改提交的列，并返回更新后的完整记录"""
+    user = create_user(db, "alice", full_name="Alice", bio="hello")
+    headers = auth_headers(client, "alice")
+    statements = []
+
+    def record_update(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE users"):
+            statements.append(statement.split("RETURNING")[0])
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record_update)
+    try:
+        response = client.put(f"/api/v1/users/{user.id}", json={"full_name": "Alice A"}, headers=headers)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record_update)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["id"], data["username"], data["full_name"], data["bio"]) == (user.id, "alice", "Alice A", "hello")
+    assert data["updated_at"] != user.updated_at.isoformat()
+
+    assert len(statements) == 1
+    set_clause = statements[0]
+    assert "full_name" in set_clause and "updated_at" in set_clause
+    assert "bio" not in set_clause and "email" not in set_clause and "hashed_password" not in set_clause
+
+    response = client.put(f"/api/v1/users/{user.id + 100}", json={"full_name": "Nobody"}, headers=headers)
+    assert response.status_code == 404